@@ -1,50 +1,205 @@
-import tensorflow as tf
+import os
+import time
 import numpy as np
 import pandas as pd
+from instrumentation import DISABLED
+
+WINDOW_SIZE = 3000   # 每个窗口的采样点数（2000Hz 下 1.5 秒）
+NUM_CHANNELS = 4     # 肌电通道数
+SAMPLING_RATE = 2000  # 训练数据的采样率（Hz），其他采样率的数据需先用 resampler.py 重采样
+
+
+def standardize_windows(windows):
+    """
+    按窗口、按通道标准化（与训练时一致），一次向量化完成
+    :param windows: 形状 (N, T, C) 的数组
+    :return: 标准化后的 float32 新数组，不修改输入
+    """
+    data = np.array(windows, dtype=np.float32)  # 拷贝一份，不修改调用方数据
+    # 沿时间轴求每个窗口、每个通道的均值和标准差，原地完成标准化
+    data -= data.mean(axis=1, keepdims=True)
+    data /= data.std(axis=1, keepdims=True)
+    return data
+
 
 class EMGGestureClassifier:
-    def __init__(self, model_path):
+    def __init__(self, model_path, fast_inference=False, backend="keras", instrumentation=None):
         """
         加载预训练模型
-        :param model_path: 模型文件路径（.h5 或 SavedModel 目录）
+        :param model_path: 模型文件路径（.h5 或 SavedModel 目录，窗口长度取自模型的输入形状；backend="numpy" 时为 numpyengine 导出的 .npz，
+                           backend="tflite" 时为 quantize.py 生成的 float16 / int8 .tflite 文件）
+        :param fast_inference: 为 True 时单窗口预测绕过 model.predict，
+                               直接调用固定输入签名 (1, 3000, 4) float32 的 tf.function，并在构造时完成预热
+        :param backend: "keras" 使用 TensorFlow 加载模型；"numpy" 使用纯 NumPy 运行时，不导入 TensorFlow；
+                        "tflite" 使用低精度（float16 / int8 量化）TFLite 模型
+        :param instrumentation: 可选的 instrumentation.Instrumentation，记录 preprocess / model / postprocess 各阶段耗时
         """
+        self.label_map = {0: 'i', 1: 'b', 2: 'h', 3: 'e'}  # 与训练时letters顺序一致
+        self.backend = backend
+        self.instrumentation = instrumentation if instrumentation is not None else DISABLED
+        self._infer_fn = None
+        self.window_size = WINDOW_SIZE
+
+        if backend == "numpy":
+            from numpyengine import NumpyGestureModel
+            self.model = NumpyGestureModel(model_path)
+            self.label_map = dict(enumerate(self.model.labels))
+            self.window_size = self.model.input_shape[0]
+            return
+        if backend == "tflite":
+            from quantize import TFLiteGestureModel
+            self.model = TFLiteGestureModel(model_path)
+            self.window_size = self.model.input_shape[0]
+            return
+        if backend != "keras":
+            raise ValueError(f"不支持的推理后端: {backend}")
+
+        import tensorflow as tf
         # 抑制TensorFlow的冗余日志
         tf.get_logger().setLevel('ERROR')
-        self.model = tf.keras.models.load_model("D:\develop\pythonSample\EMGGNN\emg_gesture_model")
-        self.label_map = {0: 'i', 1: 'b', 2: 'h', 3: 'e'}  # 与训练时letters顺序一致
+        self.model = tf.keras.models.load_model(model_path)
+        self.window_size = self.model.input_shape[1]
+
+        if fast_inference:
+            self._infer_fn = tf.function(
+                lambda x: self.model(x, training=False),
+                input_signature=[tf.TensorSpec(shape=(1, self.window_size, NUM_CHANNELS), dtype=tf.float32)]
+            )
+            # 预热：触发一次图追踪，避免首个实时窗口承担追踪开销
+            self._infer_fn(tf.zeros((1, self.window_size, NUM_CHANNELS), dtype=tf.float32))
+
+    @classmethod
+    def from_variants(cls, manifest_path, latency_budget_ms, backend="numpy", percentile="p99", remeasure=False,
+                      instrumentation=None):
+        """
+        从 cnnrun.py 训练的模型变体中，选择单窗口延迟不超过预算且准确率最高的一个并加载
+        :param manifest_path: variants.json 或其所在目录
+        :param latency_budget_ms: 单窗口延迟预算（毫秒）
+        :param backend: "numpy" 或 "keras"
+        :param percentile: 与预算比较的延迟分位数，"p50" 或 "p99"
+        :param remeasure: 为 True 时先在本机重新测量各变体的延迟
+        :return: 分类器实例，选中的变体信息保存在 variant 属性中
+        """
+        from modelvariants import load_manifest, select_variant
+        variant = select_variant(load_manifest(manifest_path), latency_budget_ms, backend, percentile, remeasure)
+        classifier = cls(variant["paths"][backend], fast_inference=backend == "keras", backend=backend,
+                         instrumentation=instrumentation)
+        classifier.variant = variant
+        return classifier
 
     def preprocess(self, raw_data):
         """
         数据预处理（与训练时完全一致）
-        :param raw_data: 原始肌电数据，形状需为 (3000, 4) 的numpy数组
-        :return: 标准化后的数据，形状 (1, 3000, 4)
+        :param raw_data: 原始肌电数据，形状需为 (window_size, 4) 的numpy数组（默认模型为 (3000, 4)）
+        :return: 标准化后的数据，形状 (1, window_size, 4)
         """
-        if raw_data.shape != (3000, 4):
-            raise ValueError(f"输入数据形状需为 (3000, 4)，当前形状: {raw_data.shape}")
+        if raw_data.shape != (self.window_size, NUM_CHANNELS):
+            raise ValueError(f"输入数据形状需为 ({self.window_size}, {NUM_CHANNELS})，当前形状: {raw_data.shape}")
+
+        with self.instrumentation.stage("preprocess"):
+            data = raw_data.astype(np.float32)
+            # 按通道标准化
+            for channel in range(4):
+                data[:, channel] = (data[:, channel] - np.mean(data[:, channel])) / np.std(data[:, channel])
+            return np.expand_dims(data, axis=0)  # 添加batch维度
 
-        data = raw_data.astype(np.float32)
-        # 按通道标准化
-        for channel in range(4):
-            data[:, channel] = (data[:, channel] - np.mean(data[:, channel])) / np.std(data[:, channel])
-        return np.expand_dims(data, axis=0)  # 添加batch维度
+    def preprocess_batch(self, raw_batch):
+        """
+        批量数据预处理，一次向量化完成所有窗口、所有通道的标准化
+        :param raw_batch: 原始肌电数据，形状需为 (N, window_size, 4) 的numpy数组
+        :return: 标准化后的数据，形状 (N, window_size, 4)，float32
+        """
+        if raw_batch.ndim != 3 or raw_batch.shape[1:] != (self.window_size, NUM_CHANNELS):
+            raise ValueError(f"输入数据形状需为 (N, {self.window_size}, {NUM_CHANNELS})，当前形状: {raw_batch.shape}")
+
+        return standardize_windows(raw_batch)
 
     def predict(self, data):
         """
         执行预测
-        :param data: 预处理后的数据（形状 (1, 3000, 4)）
+        :param data: 预处理后的数据（形状 (1, window_size, 4)）
         :return: 预测结果字典
         """
-        if data.shape != (1, 3000, 4):
-            raise ValueError(f"输入数据形状需为 (1, 3000, 4)，当前形状: {data.shape}")
+        if data.shape != (1, self.window_size, NUM_CHANNELS):
+            raise ValueError(f"输入数据形状需为 (1, {self.window_size}, {NUM_CHANNELS})，当前形状: {data.shape}")
 
-        probabilities = self.model.predict(data, verbose=0)[0]
-        pred_class = np.argmax(probabilities)
-        return {
-            "label": self.label_map[pred_class],
-            "confidence": float(probabilities[pred_class]),
-            "probabilities": {
-                label: float(prob) for label, prob in zip(self.label_map.values(), probabilities)
+        with self.instrumentation.stage("model"):
+            probabilities = self._predict_single(data)
+        with self.instrumentation.stage("postprocess"):
+            pred_class = np.argmax(probabilities)
+            return {
+                "label": self.label_map[pred_class],
+                "confidence": float(probabilities[pred_class]),
+                "probabilities": {
+                    label: float(prob) for label, prob in zip(self.label_map.values(), probabilities)
+                }
             }
+
+    def predict_batch(self, data, batch_size=256):
+        """
+        批量执行预测
+        :param data: 预处理后的数据（形状 (N, window_size, 4)）
+        :param batch_size: 每次送入模型的窗口数
+        :return: 预测结果字典，各字段均为长度 N 的数组：
+                 labels (标签字符)、label_indices (类别索引)、
+                 confidences (置信度)、probabilities (形状 (N, 4) 的概率矩阵)
+        """
+        if data.ndim != 3 or data.shape[1:] != (self.window_size, NUM_CHANNELS):
+            raise ValueError(f"输入数据形状需为 (N, {self.window_size}, {NUM_CHANNELS})，当前形状: {data.shape}")
+        if batch_size < 1:
+            raise ValueError(f"batch_size 需为正整数，当前值: {batch_size}")
+
+        probabilities = np.empty((data.shape[0], len(self.label_map)), dtype=np.float32)
+        for start in range(0, data.shape[0], batch_size):
+            end = min(start + batch_size, data.shape[0])
+            probabilities[start:end] = self._predict_proba(data[start:end])
+
+        pred_classes = np.argmax(probabilities, axis=1)
+        label_names = np.array(list(self.label_map.values()))
+        return {
+            "labels": label_names[pred_classes],
+            "label_indices": pred_classes,
+            "confidences": probabilities[np.arange(data.shape[0]), pred_classes],
+            "probabilities": probabilities
+        }
+
+    def _predict_single(self, data):
+        """对单个窗口 (1, window_size, 4) 调用模型，返回形状 (4,) 的概率"""
+        if self._infer_fn is not None:
+            return self._infer_fn(np.asarray(data, dtype=np.float32)).numpy()[0]
+        return self.model.predict(data, verbose=0)[0]
+
+    def _predict_proba(self, batch):
+        """对一个批次调用模型，返回形状 (n, 4) 的概率矩阵"""
+        # predict_on_batch 不会为每次调用重新构建数据管道
+        return np.asarray(self.model.predict_on_batch(np.asarray(batch, dtype=np.float32)))
+
+    def latency_report(self, n_calls=200, raw_data=None, warmup=10):
+        """
+        测量单窗口识别（preprocess + predict）的延迟分布
+        :param n_calls: 计时的调用次数
+        :param raw_data: 用于测试的 (window_size, 4) 原始数据，默认使用随机数据
+        :param warmup: 正式计时前的预热调用次数
+        :return: 延迟统计字典（单位：毫秒），包含 p50/p95/p99/mean/max
+        """
+        if raw_data is None:
+            raw_data = np.random.randn(self.window_size, NUM_CHANNELS)
+        for _ in range(warmup):
+            self.predict(self.preprocess(raw_data))
+
+        latencies = np.empty(n_calls)
+        for i in range(n_calls):
+            start = time.perf_counter()
+            self.predict(self.preprocess(raw_data))
+            latencies[i] = (time.perf_counter() - start) * 1000
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "n_calls": n_calls,
+            "p50_ms": float(p50),
+            "p95_ms": float(p95),
+            "p99_ms": float(p99),
+            "mean_ms": float(latencies.mean()),
+            "max_ms": float(latencies.max())
         }
 
     def predict_from_csv(self, csv_path):
@@ -57,3 +212,51 @@ class EMGGestureClassifier:
         processed = self.preprocess(raw_data)
         return self.predict(processed)
 
+    def predict_from_directory(self, directory, output_path=None, workers=None, batch_size=256, chunk_size=64):
+        """
+        对目录下所有 (3000, 4) 窗口 CSV 批量预测，解析由进程池并行完成，边解析边送入批量推理
+        :param directory: 窗口 CSV 所在目录
+        :param output_path: 可选，结果表输出路径（CSV）
+        :param workers: 解析进程数，默认 CPU 核数
+        :param batch_size: 每次送入模型的窗口数
+        :param chunk_size: 每个解析任务处理的文件数
+        :return: 结果表 DataFrame，每个文件一行：file, label, confidence 以及各类别概率；
+                 形状不符的文件 label 为空、概率为 NaN
+        """
+        from parallelio import iter_windows, list_window_files
+
+        paths = list_window_files(directory)
+        label_names = list(self.label_map.values())
+        labels = np.full(len(paths), None, dtype=object)
+        probabilities = np.full((len(paths), len(label_names)), np.nan, dtype=np.float32)
+
+        def flush(rows, windows):
+            result = self.predict_batch(self.preprocess_batch(np.concatenate(windows)), batch_size=batch_size)
+            rows = np.concatenate(rows)
+            labels[rows] = result["labels"]
+            probabilities[rows] = result["probabilities"]
+
+        # 解析结果按块到达，攒够 batch_size 个有效窗口再推理
+        pending_rows, pending_windows, pending_count = [], [], 0
+        offset = 0
+        for chunk, data, valid in iter_windows(paths, workers=workers, chunk_size=chunk_size):
+            pending_rows.append(offset + np.flatnonzero(valid))
+            pending_windows.append(data[valid])
+            pending_count += int(valid.sum())
+            offset += len(chunk)
+            if pending_count >= batch_size:
+                flush(pending_rows, pending_windows)
+                pending_rows, pending_windows, pending_count = [], [], 0
+        if pending_count:
+            flush(pending_rows, pending_windows)
+
+        table = pd.DataFrame({
+            "file": [os.path.basename(p) for p in paths],
+            "label": labels,
+            "confidence": probabilities.max(axis=1),
+        })
+        for i, name in enumerate(label_names):
+            table[f"prob_{name}"] = probabilities[:, i]
+        if output_path is not None:
+            table.to_csv(output_path, index=False)
+        return table
@@ -1,4 +1,6 @@
 import sys
+import time
+import argparse
 import numpy as np
 import pyqtgraph as pg
 import os
@@ -25,42 +27,127 @@ from PyQt6.QtWidgets import (
     QCheckBox,
 )
 from PyQt6.QtGui import QAction
-from nidaqmx import Task
-from nidaqmx.constants import AcquisitionType
+from EMGGestureClassifier import EMGGestureClassifier, SAMPLING_RATE
+from streamrecognizer import StreamingGestureRecognizer
+from instrumentation import Instrumentation, DISABLED
+from acquisition import AcquisitionThread
+from ringbuffer import TimedRingBuffer
+from recorder import StreamRecorder
+from daqsource import create_source, SOURCE_KINDS
+from activitygate import ActivityGate
+from resampler import PolyphaseResampler
+
+MODEL_PATH = "emg_gesture_model"
 
 # 新增识别控制类
 class GestureRecognitionController(QThread):
     recognition_success = pyqtSignal(str)  # 识别成功信号
 
-    def __init__(self, task, sample_rate=1000, buffer_size=200):
+    def __init__(self, acquisition, hop=500, instrumentation=None):
+        """
+        :param acquisition: AcquisitionThread，识别数据来自其发布的数据块，不再单独读取设备
+        :param hop: 两次识别之间的样本数
+        """
         super().__init__()
-        self.task = task
-        self.sample_rate = sample_rate
-        self.buffer_size = buffer_size
+        self.acquisition = acquisition
+        self.instrumentation = instrumentation if instrumentation is not None else DISABLED
+        self.hop = hop  # 两次识别之间的样本数
         self.running = False
         self.recognizer = self.GestureRecognition()
+        # 采集卡（1000 Hz）与训练数据（2000 Hz）采样率不同时，逐块重采样后再识别
+        self.resampler = None
+        if acquisition.sampling_rate != SAMPLING_RATE:
+            self.resampler = PolyphaseResampler.from_rates(
+                acquisition.sampling_rate, SAMPLING_RATE, acquisition.buffer.num_channels)
 
     def run(self):
-        """持续采集并识别数据"""
+        """订阅采集数据块并识别（从启动识别时刻之后的数据开始）"""
         self.running = True
-        while self.running:
-            data = self.task.read(number_of_samples_per_channel=self.buffer_size)
-            gesture = self.recognizer.process_data(np.array(data))
-            if gesture != "Unknown":
-                self.recognition_success.emit(gesture)
-                break  # 识别成功时退出循环
+        # 识别只关心最新的数据：落后超过约 5 秒时丢弃最早的数据块
+        max_chunks = max(1, int(5 * self.acquisition.sampling_rate / self.acquisition.samples_per_read))
+        subscription = self.acquisition.subscribe("recognition", maxsize=max_chunks, policy="drop_oldest")
+        cursor = None
+        try:
+            while self.running:
+                item = subscription.get(timeout=0.5)
+                if item is None:
+                    continue
+                start, data = item
+                if cursor is not None and start != cursor:
+                    # 识别落后过多，部分数据块被丢弃，窗口不再连续，重新开始
+                    self.recognizer.reset()
+                    if self.resampler is not None:
+                        self.resampler.reset()
+                cursor = start + data.shape[0]
+                if self.resampler is not None:
+                    data = self.resampler.process(data)
+                # 静息窗口被门控跳过，不算识别成功
+                results = [r for r in self.recognizer.push(data) if not r["gated"]]
+                if results:
+                    self.recognition_success.emit(results[-1]["label"])
+                    break  # 识别成功时退出循环
+        finally:
+            subscription.close()
 
     def stop(self):
         self.running = False
+
     def GestureRecognition(self):
-        return
+        """创建流式识别器，每收到一块数据就增量更新窗口；手臂静止时由活动检测跳过模型推理"""
+        classifier = EMGGestureClassifier(MODEL_PATH, instrumentation=self.instrumentation)
+        gate = ActivityGate(self.acquisition.buffer.num_channels, SAMPLING_RATE)  # 门控作用于重采样后的数据
+        return StreamingGestureRecognizer(classifier, hop=self.hop, gate=gate)
+
+def decimate_minmax(time_axis, data, max_points):
+    """
+    按最大/最小值抽取波形（保留峰值），每个桶输出最小值和最大值两个点
+    桶边界按全局样本序号对齐，波形滚动时抽取结果保持稳定，不会闪烁
+    :param time_axis: 形状 (N,) 的等间隔时间轴
+    :param data: 形状 (C, N) 的数据
+    :param max_points: 输出点数上限（通常为绘图区宽度像素数的 2 倍）
+    :return: (time_axis, data)，点数不超过 max_points 时原样返回
+    """
+    n = data.shape[1]
+    if n <= max_points or n < 2:
+        return time_axis, data
+    bucket = -(-2 * n // max_points)  # 每个桶的样本数
+    dt = time_axis[1] - time_axis[0]
+    start = int(-round(time_axis[0] / dt)) % bucket  # 第一个完整桶的起点
+    n_buckets = (n - start) // bucket
+    stop = start + n_buckets * bucket
+    blocks = data[:, start:stop].reshape(data.shape[0], n_buckets, bucket)
+    out = np.empty((data.shape[0], n_buckets, 2), dtype=data.dtype)
+    np.min(blocks, axis=2, out=out[:, :, 0])
+    np.max(blocks, axis=2, out=out[:, :, 1])
+    times = np.repeat(time_axis[start:stop:bucket], 2)
+    times[1::2] += (bucket - 1) * dt  # 最大值点放在桶末尾，保持时间单调
+    return times, out.reshape(data.shape[0], -1)
+
 
 class MultiChannelWaveformDisplay(QWidget):
-    def __init__(self, num_channels=4):
+    def __init__(self, num_channels=4, render_mode="decimated", max_fps=30, range_hysteresis=0.2):
+        """
+        :param num_channels: 通道数
+        :param render_mode: "decimated" 按绘图区像素宽度做最大/最小值抽取后绘制；"raw" 绘制全部原始点
+        :param max_fps: 最高刷新帧率，与采集速率无关，超出的更新合并到下一帧
+        :param range_hysteresis: Y 轴范围收缩超过当前跨度的这一比例时才调整（数据超出范围时立即扩大）
+        """
         super().__init__()
         self.num_channels = num_channels
+        self.render_mode = render_mode
+        self.range_hysteresis = range_hysteresis
+        self.frame_interval = 1.0 / max_fps
         self.init_ui()
         self.selected_channel = None  # 当前选中的通道
+        self.is_paused = False
+        self._y_ranges = [(-1.0, 1.0)] * num_channels  # 各通道当前的 Y 轴范围
+        self._pending = None  # 等待绘制的 (time_axis, data)
+        self._latest = None  # 最近一次传入的完整分辨率数据，供保存使用
+        self._last_render = 0.0
+        # 帧率限制：过早到达的更新在此定时器触发时绘制
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setSingleShot(True)
+        self._frame_timer.timeout.connect(self._render)
 
     def init_ui(self):
         """初始化波形显示界面"""
@@ -84,6 +171,8 @@ class MultiChannelWaveformDisplay(QWidget):
             )
 
             curve = plot.plot(pen=pg.mkPen(color=(i, self.num_channels), width=2))
+            if self.plots:
+                plot.setXLink(self.plots[0])  # 所有通道共用 X 轴，滚动时只需设置一次
             self.plots.append(plot)
             self.curves.append(curve)
             self.layout.addWidget(plot)
@@ -99,48 +188,92 @@ class MultiChannelWaveformDisplay(QWidget):
         for i, plot in enumerate(self.plots):
             if i == self.selected_channel:
                 plot.setTitle(f"Channel {i+1} (Selected)", color="r")
-                plot.setYRange(-2, 2)  # 放大Y轴范围
+                self._set_y_range(i, -2, 2)  # 放大Y轴范围
             else:
                 plot.setTitle(f"Channel {i+1}", color="k")
-                plot.setYRange(-1, 1)  # 恢复默认范围
+                self._set_y_range(i, -1, 1)  # 恢复默认范围
+
+    def toggle_pause(self):
+        """暂停/恢复波形刷新（采集和记录不受影响）"""
+        self.is_paused = not self.is_paused
 
-    
     def update_waveforms(self, time_axis, data):
-        """更新波形数据，支持动态时间轴"""
-        if data.size == 0:
+        """
+        更新波形数据，支持动态时间轴
+        实际绘制不超过 max_fps 帧/秒，两帧之间的多次更新只绘制最后一次
+        :param time_axis: 形状 (N,) 的时间轴
+        :param data: 形状 (C, N) 的数据，绘制前抽取，可以传入视图
+        """
+        if data.size == 0 or self.is_paused:
             return
+        self._latest = self._pending = (time_axis, data)
+        wait = self._last_render + self.frame_interval - time.perf_counter()
+        if wait <= 0:
+            self._render()
+        elif not self._frame_timer.isActive():
+            self._frame_timer.start(int(wait * 1000) + 1)
+
+    def get_waveform_data(self):
+        """
+        当前显示的波形（完整分辨率，未抽取）
+        :return: 形状 (N, 1 + 通道数) 的数组，第一列为时间；尚无数据时返回 None
+        """
+        if self._latest is None:
+            return None
+        time_axis, data = self._latest
+        return np.column_stack([time_axis, np.asarray(data).T])
+
+    def _render(self):
+        if self._pending is None:
+            return
+        time_axis, data = self._pending
+        self._pending = None
+        self._last_render = time.perf_counter()
+
+        if self.render_mode == "decimated":
+            # 每个像素列画一对最大/最小值点
+            width = max(int(self.plots[0].getViewBox().width()), 1)
+            time_axis, data = decimate_minmax(time_axis, data, 2 * width)
 
         # 更新每条曲线
         for i, curve in enumerate(self.curves):
             curve.setData(time_axis, data[i])
 
-            # 动态调整Y轴范围（可选）
-            y_min, y_max = np.min(data[i]), np.max(data[i])
+            # 动态调整Y轴范围，带滞回，避免每帧重设
+            y_min, y_max = float(np.min(data[i])), float(np.max(data[i]))
             margin = 0.1 * (y_max - y_min) if y_max != y_min else 0.5
-            self.plots[i].setYRange(y_min - margin, y_max + margin)
+            self._update_y_range(i, y_min - margin, y_max + margin)
+
+        # 自动滚动X轴（关键！），各通道 X 轴已联动
+        self.plots[0].setXRange(time_axis[0], time_axis[-1], padding=0)
 
-        # 自动滚动X轴（关键！）
-        for plot in self.plots:
-            plot.setXRange(time_axis[0], time_axis[-1], padding=0)
+    def _update_y_range(self, i, low, high):
+        """数据超出当前范围时立即扩大；范围需收缩超过 range_hysteresis 时才收缩"""
+        cur_low, cur_high = self._y_ranges[i]
+        threshold = self.range_hysteresis * (cur_high - cur_low)
+        if low < cur_low or high > cur_high or low - cur_low > threshold or cur_high - high > threshold:
+            self._set_y_range(i, low, high)
+
+    def _set_y_range(self, i, low, high):
+        self._y_ranges[i] = (low, high)
+        self.plots[i].setYRange(low, high, padding=0)
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, source=None):
+        """
+        :param source: 采集数据源（见 daqsource.py），默认打开 NI 设备 Dev1/ai0:3
+        """
         super().__init__()
+        self.source = source
         self.auto_save_counter = 1
+        self.instrumentation = Instrumentation(enabled=True)  # 识别各阶段延迟统计
         self.init_settings()
         self.init_ui()
         self.init_data()
         self.init_gesture_control()
 
     def init_gesture_control(self):
-        """初始化手势识别控制器"""
-        self.gesture_task = Task()
-        self.gesture_task.ai_channels.add_ai_voltage_chan("Dev1/ai0:3")
-        self.gesture_task.timing.cfg_samp_clk_timing(
-            rate=1000,
-            sample_mode=AcquisitionType.CONTINUOUS,
-            samps_per_chan=200
-        )
+        """初始化手势识别控制器（识别数据与显示共用采集线程的缓冲区）"""
         self.recognition_controller = None
 
     def toggle_recognition(self):
@@ -158,7 +291,8 @@ class MainWindow(QMainWindow):
         self.start_recog_btn.setStyleSheet("background-color: #f44336;")
 
         # 启动识别线程
-        self.recognition_controller = GestureRecognitionController(self.gesture_task)
+        self.recognition_controller = GestureRecognitionController(
+            self.acquisition, instrumentation=self.instrumentation)
         self.recognition_controller.recognition_success.connect(self.on_recognition_success)
         self.recognition_controller.start()
 
@@ -179,7 +313,14 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         """窗口关闭时释放资源"""
         self.stop_recognition()
-        
+
+        # 停止记录（写完已采集的数据），再停止采集线程，最后关闭其读取的任务
+        if getattr(self, 'recorder', None):
+            self.recorder.stop()
+            self.recorder = None
+        if hasattr(self, 'acquisition') and self.acquisition:
+            self.acquisition.stop(timeout=1.0)
+
         # 安全关闭数据采集任务
         if hasattr(self, 'acq_task') and self.acq_task:
             try:
@@ -188,11 +329,7 @@ class MainWindow(QMainWindow):
                 self.acq_task = None  # 清除引用
             except Exception as e:
                 print(f"关闭任务时出错: {e}")
-        
-        # 关闭手势识别任务
-        if hasattr(self, 'gesture_task') and self.gesture_task:
-            self.gesture_task.close()
-        
+
         super().closeEvent(event)
     
     def init_settings(self):
@@ -284,8 +421,18 @@ class MainWindow(QMainWindow):
         self.acquisition_status = QLabel("采集状态：运行中")
         self.acquisition_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
         
+        # 连续记录进度
+        self.auto_save_status_label = QLabel("最后自动保存：--")
+        self.auto_save_status_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
+        # 识别延迟（p50 / p99）
+        self.latency_status = QLabel("识别延迟：--")
+        self.latency_status.setAlignment(Qt.AlignmentFlag.AlignCenter)
+
         status_layout.addWidget(self.auto_save_status)
+        status_layout.addWidget(self.auto_save_status_label)
         status_layout.addWidget(self.acquisition_status)
+        status_layout.addWidget(self.latency_status)
         right_layout.addWidget(status_group)
 
         # 3. 控制按钮区域
@@ -322,6 +469,21 @@ class MainWindow(QMainWindow):
         # 初始化状态显示
         self.update_auto_save_status()
 
+        # 每秒刷新一次延迟统计
+        self.latency_timer = QTimer(self)
+        self.latency_timer.timeout.connect(self.update_latency_status)
+        self.latency_timer.start(1000)
+
+    def update_latency_status(self):
+        """显示各阶段延迟的 p50 / p99（毫秒）"""
+        snapshot = self.instrumentation.snapshot()
+        names = [("daq_read", "采集"), ("preprocess", "预处理"), ("model", "模型"), ("end_to_end", "端到端")]
+        lines = [
+            f"{title}: {snapshot[name]['p50_ms']:.1f} / {snapshot[name]['p99_ms']:.1f} ms"
+            for name, title in names if name in snapshot
+        ]
+        self.latency_status.setText("识别延迟 p50 / p99\n" + "\n".join(lines) if lines else "识别延迟：--")
+
     def toggle_pause(self):
         """切换暂停状态"""
         self.waveform_display.toggle_pause()
@@ -339,12 +501,7 @@ class MainWindow(QMainWindow):
         """切换自动保存状态"""
         self.auto_save_enabled = not self.auto_save_enabled
         self.settings.setValue("auto_save_enabled", "true" if self.auto_save_enabled else "false")
-
-        if self.auto_save_enabled:
-            self.auto_save_timer.start(self.auto_save_interval * 1000)
-        else:
-            self.auto_save_timer.stop()
-
+        self.apply_auto_save()
         self.update_auto_save_status()
 
     def update_auto_save_status(self):
@@ -424,53 +581,81 @@ class MainWindow(QMainWindow):
         self.settings.setValue("save_path", path)
         self.settings.setValue("max_file_size", max_size)
 
-        # 重启定时器
-        if enabled:
-            self.auto_save_timer.start(interval * 1000)
+        # 按新配置重启记录线程和定时器
+        self.apply_auto_save()
+        self.update_auto_save_status()
+
+    def apply_auto_save(self):
+        """
+        按当前配置启动/停止连续记录：开启时后台线程把采集到的每个样本写入 save_path 下的 .emgrec 文件，
+        单个文件达到 max_file_size（MB）后切换新文件；auto_save_interval 为刷新到磁盘及状态显示的间隔
+        """
+        if self.recorder is not None:
+            self.recorder.stop()
+            self.recorder = None
+        if self.auto_save_enabled:
+            self.recorder = StreamRecorder(self.acquisition, self.save_path, max_file_size=self.max_file_size,
+                                           flush_interval=self.auto_save_interval)
+            self.recorder.start()
+            self.auto_save_timer.start(self.auto_save_interval * 1000)
         else:
             self.auto_save_timer.stop()
 
-        self.update_auto_save_status()
-
     def init_data(self):
+        # 数据源：默认 NI-6009，1000 Hz（根据实际配置调整）
+        self.acq_task = self.source if self.source is not None else create_source(
+            "ni", device="Dev1/ai0:3", sampling_rate=1000, buffer_size=1000)
+        self.acq_task.start()
+
         # 初始化参数
-        self.sampling_rate = 1000  # NI-6009 采样率（根据实际配置调整）
+        self.sampling_rate = self.acq_task.sampling_rate
         self.update_interval_ms = 200  # 显示刷新间隔（毫秒）
-        self.samples_per_read = 200   # 每次读取的样本数
+        self.samples_per_read = 200   # 采集线程每次读取的样本数
+        self.buffer_seconds = 60  # 采集缓冲区保留的时长（秒），显示/保存/识别最多可落后这么久
         
         # 初始化数据存储
         self.time_counter = 0
-        self.history_data = np.zeros((4, 0))
         self.max_display_points = 1000  # 显示1秒的数据（1000点）
-
-        # 配置NI-DAQmx任务
-        self.acq_task = Task()
-        self.acq_task.ai_channels.add_ai_voltage_chan("Dev1/ai0:3")
-        self.acq_task.timing.cfg_samp_clk_timing(
-            rate=self.sampling_rate,
-            sample_mode=AcquisitionType.CONTINUOUS,
-            samps_per_chan=1000
-        )
-        self.acq_task.start()
-
-        # 定时器设置
+        # 显示历史：每次刷新只追加新样本，开销与 max_display_points 无关
+        self.history = TimedRingBuffer(self.max_display_points, 4, self.sampling_rate)
+        self.display_cursor = 0  # 已追加到显示历史的采集序号
+
+        # 采集在独立线程中进行，显示、记录、识别各自订阅同一份数据块
+        self.acquisition = AcquisitionThread(
+            self.acq_task, num_channels=4, samples_per_read=self.samples_per_read,
+            buffer_seconds=self.buffer_seconds, sampling_rate=self.sampling_rate,
+            instrumentation=self.instrumentation)
+        # 显示只需最近 max_display_points 个样本，GUI 卡顿时丢弃更早的数据块
+        self.display_subscription = self.acquisition.subscribe(
+            "display", maxsize=-(-self.max_display_points // self.samples_per_read) + 1, policy="drop_oldest")
+        self.acquisition.start()
+
+        # 连续记录（自动保存）
+        self.recorder = None
+        self.auto_save_timer = QTimer(self)
+        self.auto_save_timer.timeout.connect(self.auto_save_data)
+        self.apply_auto_save()
+
+        # 定时器设置（只负责刷新显示）
         self.timer = QTimer()
         self.timer.timeout.connect(self.read_real_data)
         self.timer.start(self.update_interval_ms)
 
     def auto_save_data(self):
-        """自动保存数据"""
-        if not self.waveform_display.is_paused:
-            try:
-                filename = self.generate_filename()
-                data = self.waveform_display.get_waveform_data()
-                if data is not None:
-                    np.save(filename, data)
-                    self.auto_save_status_label.setText(
-                        f"最后自动保存：{datetime.datetime.now().strftime('%H:%M:%S')}"
-                    )
-            except Exception as e:
-                print(f"自动保存失败：{str(e)}")
+        """刷新自动保存状态（数据由后台记录线程持续写入，不占用 GUI 线程）"""
+        recorder = self.recorder
+        if recorder is None:
+            return
+        if recorder.error is not None:
+            self.auto_save_status_label.setText(f"自动保存失败：{str(recorder.error)}")
+            return
+        if recorder.last_flush is None or recorder.current_file is None:
+            return
+        text = (f"最后自动保存：{datetime.datetime.fromtimestamp(recorder.last_flush).strftime('%H:%M:%S')}"
+                f"\n{os.path.basename(recorder.current_file)}（{recorder.samples_written / self.sampling_rate:.0f} 秒）")
+        if recorder.dropped_samples:
+            text += f"\n丢失 {recorder.dropped_samples} 个样本"
+        self.auto_save_status_label.setText(text)
     
     def save_data(self):
         """保存波形数据"""
@@ -509,31 +694,38 @@ class MainWindow(QMainWindow):
     #     self.waveform_display.update_waveforms(data)
 
     def read_real_data(self):
+        """取出上次刷新以来发布的数据块，追加到显示历史后刷新显示（不在 GUI 线程中读取设备）"""
         try:
-            # 读取数据
-            new_data = self.acq_task.read(number_of_samples_per_channel=self.samples_per_read)
-            new_data = np.array(new_data)  # 形状: (4, samples_per_read)
-            
-            # 计算时间轴
-            time_per_update = self.samples_per_read / self.sampling_rate
-            new_time = self.time_counter + np.arange(self.samples_per_read) / self.sampling_rate
-            self.time_counter = new_time[-1]  # 更新全局时间戳
-            
-            # 累积数据并截取最近部分
-            self.history_data = np.hstack((self.history_data, new_data))[:, -self.max_display_points:]
-            time_axis = np.linspace(
-                max(0, self.time_counter - self.max_display_points/self.sampling_rate),
-                self.time_counter,
-                self.history_data.shape[1]
-            )
-            
-            # 更新显示
-            self.waveform_display.update_waveforms(time_axis, self.history_data)
+            chunks = self.display_subscription.get_all()
+            if not chunks:
+                return
+            for start, data in chunks:
+                self.history.append(data, start_index=start)
+            self.display_cursor = start + data.shape[0]
+
+            time_axis = self.history.latest_times()
+            self.time_counter = time_axis[-1]  # 更新全局时间戳
+
+            # 更新显示，数据以 (通道, 样本) 视图传入
+            self.waveform_display.update_waveforms(time_axis, self.history.latest().T)
         except Exception as e:
             print(f"数据读取失败: {str(e)}")
             
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    parser = argparse.ArgumentParser(description="EMG 数据采集与手势识别")
+    parser.add_argument("--source", default="ni", choices=SOURCE_KINDS,
+                        help="数据源：ni 为 NI 设备，replay 回放录音，synthetic 合成信号")
+    parser.add_argument("--replay-path", help="回放的录音文件（.emgrec/.npy/.csv），默认回放 i/b/h/e 录音")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放/合成数据相对实时的倍速")
+    args, qt_args = parser.parse_known_args()
+
+    source = None
+    if args.source == "replay":
+        source = create_source("replay", path=args.replay_path, speed=args.speed)
+    elif args.source == "synthetic":
+        source = create_source("synthetic", speed=args.speed)
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    window = MainWindow(source)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
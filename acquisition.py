@@ -0,0 +1,217 @@
+import time
+import threading
+from collections import deque
+import numpy as np
+from instrumentation import DISABLED
+from ringbuffer import MultiChannelRingBuffer
+
+# 独立的数据采集线程：设备只由这一个线程读取，每个数据块只转换一次，
+# 以只读数组的形式同时写入环形缓冲区并发布给所有订阅者（显示、记录、识别……），
+# 增加消费者不会增加设备读取或数据拷贝，GUI 卡顿也不会影响设备读取
+#
+# 每个订阅者有自己的队列深度和队列满时的处理策略：
+#   drop_oldest  丢弃最早的数据块（显示、识别等只关心最新数据的消费者）
+#   drop_newest  丢弃新到的数据块
+#   block        有限的背压：队列满时采集线程最多等待 block_timeout 秒，仍然满则丢弃新块并进入溢出状态，
+#                此后直接丢弃新块、不再等待，直到消费者把队列取到 maxsize 以下；
+#                停滞的消费者只会让采集线程等待一次，之后不再拖慢设备读取和其他订阅者
+# 丢弃会使数据块的起始序号出现跳变，消费者据此发现缺口
+
+SUBSCRIBER_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class Subscription:
+    """
+    一个订阅者的数据块队列（单生产者单消费者）
+    队列中的元素为 (start_index, chunk)：chunk 为形状 (n, 通道) 的只读 float32 数组，
+    所有订阅者共享同一个数组对象，start_index 为其第一个样本的全局序号
+    """
+
+    def __init__(self, name="subscriber", maxsize=64, policy="drop_oldest", block_timeout=1.0):
+        """
+        :param name: 订阅者名称（用于统计显示）
+        :param maxsize: 队列最多容纳的数据块数
+        :param policy: 队列满时的处理策略，见 SUBSCRIBER_POLICIES
+        :param block_timeout: block 策略下采集线程最多等待的时间（秒），超时后进入溢出状态，不再等待
+        """
+        if policy not in SUBSCRIBER_POLICIES:
+            raise ValueError(f"不支持的队列策略: {policy}，可选 {SUBSCRIBER_POLICIES}")
+        if maxsize < 1:
+            raise ValueError(f"maxsize 需为正整数，当前值: {maxsize}")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.closed = False
+        self.overflowing = False  # block 策略等待超时后置位，队列取到 maxsize 以下时清除
+        self.received_chunks = 0
+        self.dropped_chunks = 0
+        self.dropped_samples = 0
+        self._queue = deque()
+        self._cond = threading.Condition()
+
+    def put(self, start_index, chunk):
+        """由发布者调用，按策略放入一个数据块"""
+        with self._cond:
+            if self.closed:
+                return
+            if len(self._queue) >= self.maxsize:
+                if self.policy == "block" and not self.overflowing:
+                    if not self._cond.wait_for(lambda: len(self._queue) < self.maxsize or self.closed,
+                                               self.block_timeout):
+                        self.overflowing = True
+                if self.policy == "drop_oldest":
+                    self._drop(self._queue.popleft()[1])
+                elif len(self._queue) >= self.maxsize:
+                    self._drop(chunk)
+                    return
+            self._queue.append((start_index, chunk))
+            self.received_chunks += 1
+            self._cond.notify_all()
+
+    def _drop(self, chunk):
+        self.dropped_chunks += 1
+        self.dropped_samples += chunk.shape[0]
+
+    def get(self, timeout=None):
+        """
+        取出一个数据块，阻塞直到有数据
+        :return: (start_index, chunk)；超时或订阅已关闭且队列为空时返回 None
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._queue or self.closed, timeout) or not self._queue:
+                return None
+            item = self._queue.popleft()
+            self._update_overflow()
+            self._cond.notify_all()  # 唤醒等待队列空位的发布者
+            return item
+
+    def get_all(self):
+        """不阻塞，取出队列中的全部数据块（按时间顺序）"""
+        with self._cond:
+            items = list(self._queue)
+            self._queue.clear()
+            self._update_overflow()
+            self._cond.notify_all()
+            return items
+
+    def _update_overflow(self):
+        if len(self._queue) < self.maxsize:
+            self.overflowing = False
+
+    def pending(self):
+        """队列中等待处理的数据块数"""
+        return len(self._queue)
+
+    def close(self):
+        """取消订阅：发布者不再放入数据，阻塞中的 get 立即返回"""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "pending": len(self._queue),
+            "overflowing": self.overflowing,
+            "received_chunks": self.received_chunks,
+            "dropped_chunks": self.dropped_chunks,
+            "dropped_samples": self.dropped_samples,
+        }
+
+
+class AcquisitionThread(threading.Thread):
+    """
+    单写者采集线程（唯一读取设备的地方）
+    每次阻塞读取 samples_per_read 个样本（nidaqmx 读取期间释放 GIL），转置为 (样本, 通道) 的只读数组后
+    写入 buffer，并发布给 subscribe() 返回的各个订阅。
+    样本按全局递增的序号编址；持续消费的模块使用订阅，偶尔需要历史快照的读者用 buffer.read_since(位置)。
+    """
+
+    def __init__(self, task, num_channels=4, samples_per_read=200, buffer_seconds=60, sampling_rate=1000,
+                 instrumentation=None):
+        """
+        :param task: 已配置好的数据源（daqsource 中的数据源或 nidaqmx.Task），由调用方负责 start/close
+        :param num_channels: 通道数
+        :param samples_per_read: 每次读取的样本数
+        :param buffer_seconds: 环形缓冲区可保留的时长（秒），决定读者最多可以落后多少
+        :param sampling_rate: 采样率（Hz）
+        :param instrumentation: 可选的 Instrumentation，记录 daq_read 阶段耗时
+        """
+        super().__init__(name="AcquisitionThread", daemon=True)
+        self.task = task
+        self.samples_per_read = samples_per_read
+        self.sampling_rate = sampling_rate
+        self.instrumentation = instrumentation if instrumentation is not None else DISABLED
+        self.buffer = MultiChannelRingBuffer(int(buffer_seconds * sampling_rate), num_channels, dtype=np.float32)
+        self.error_count = 0
+        self.last_error = None
+        self._stop_event = threading.Event()
+        self._new_data = threading.Condition()
+        self._subscriptions = ()  # 发布时无锁遍历，增删时整体替换
+        self._subscriptions_lock = threading.Lock()
+
+    @property
+    def total_samples(self):
+        """累计采集的样本数（下一个样本的全局序号）"""
+        return self.buffer.total_written
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.instrumentation.stage("daq_read"):
+                    data = self.task.read(number_of_samples_per_channel=self.samples_per_read)
+            except Exception as e:
+                if self._stop_event.is_set():
+                    break
+                self.error_count += 1
+                self.last_error = e
+                print(f"数据读取失败: {str(e)}")
+                time.sleep(self.samples_per_read / self.sampling_rate)  # 避免出错时空转
+                continue
+            # DAQ 返回 (通道, 样本)，缓冲区和订阅者按 (样本, 通道) 使用；只转换一次，所有消费者共享
+            chunk = np.ascontiguousarray(np.asarray(data, dtype=np.float32).T)
+            chunk.flags.writeable = False
+            start = self.buffer.total_written
+            self.buffer.append(chunk)
+            with self._new_data:
+                self._new_data.notify_all()
+            for subscription in self._subscriptions:
+                subscription.put(start, chunk)
+            if getattr(self.task, "finished", False):
+                break  # 回放数据源已耗尽
+
+    def subscribe(self, name="subscriber", maxsize=64, policy="drop_oldest", block_timeout=1.0):
+        """
+        订阅此后采集到的数据块，参数见 Subscription
+        :return: Subscription，不再需要时调用其 close()
+        """
+        subscription = Subscription(name, maxsize, policy, block_timeout)
+        with self._subscriptions_lock:
+            self._subscriptions = tuple(s for s in self._subscriptions if not s.closed) + (subscription,)
+        return subscription
+
+    def subscriptions(self):
+        """当前有效的订阅"""
+        return [s for s in self._subscriptions if not s.closed]
+
+    def wait_for_data(self, index, timeout=None):
+        """
+        阻塞等待，直到采集到全局序号 index 之后的新样本
+        :return: 是否有新数据（超时或线程已停止时返回 False）
+        """
+        with self._new_data:
+            return self._new_data.wait_for(
+                lambda: self.buffer.total_written > index or self._stop_event.is_set(), timeout
+            ) and self.buffer.total_written > index
+
+    def stop(self, timeout=None):
+        """请求停止并等待线程退出（最多等待一次读取的时间）"""
+        self._stop_event.set()
+        with self._new_data:
+            self._new_data.notify_all()
+        for subscription in self._subscriptions:
+            subscription.close()
+        if self.is_alive():
+            self.join(timeout)
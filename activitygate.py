@@ -0,0 +1,133 @@
+import numpy as np
+
+# 活动检测门控：手臂静止时跳过 CNN 推理
+# 数据按短块（默认 50 ms）计算每个通道的能量（RMS 的平方或 Teager-Kaiser 能量），
+# 与自适应的噪声基底比较；窗口内只要有一个块被判为"有肌肉活动"，就照常送入模型，否则直接输出静息结果。
+
+GATE_METHODS = ("rms", "tkeo")
+
+
+class ActivityGate:
+    """
+    逐块增量更新的能量/起始点检测器，开销与送入的样本数成正比
+
+    噪声基底按通道自适应：块能量低于基底时快速下调（attack），高于基底时按 adapt_seconds 的时间常数
+    缓慢上调，因此既能跟上电极噪声的漂移，持续数秒的收缩又不会被当成新的基底。
+    """
+
+    def __init__(self, num_channels=4, sampling_rate=2000, method="rms", block_size=100, threshold_factor=4.0,
+                 min_channels=1, adapt_seconds=10.0, warmup_seconds=1.0, rest_label="rest"):
+        """
+        :param num_channels: 通道数
+        :param sampling_rate: 采样率（Hz）
+        :param method: "rms" 块内去均值后的均方值；"tkeo" Teager-Kaiser 能量 x[n]^2 - x[n-1]x[n+1] 的块均值，
+                       对高频的肌电爆发更敏感，对缓慢的基线漂移不敏感
+        :param block_size: 能量计算的块长（样本数）
+        :param threshold_factor: 块能量超过噪声基底的多少倍视为活动（能量比，4 倍约等于幅值 2 倍）
+        :param min_channels: 至少多少个通道同时活动才判为活动
+        :param adapt_seconds: 噪声基底上调的时间常数（秒）
+        :param warmup_seconds: 启动后先用这么长的数据估计噪声基底，期间所有窗口都送入模型
+        :param rest_label: 被门控窗口输出的标签
+        """
+        if method not in GATE_METHODS:
+            raise ValueError(f"不支持的能量计算方式: {method}，可选 {GATE_METHODS}")
+        self.num_channels = num_channels
+        self.sampling_rate = sampling_rate
+        self.method = method
+        self.block_size = block_size
+        self.threshold_factor = threshold_factor
+        self.min_channels = min_channels
+        self.rest_label = rest_label
+        self._rise = block_size / (adapt_seconds * sampling_rate)  # 基底上调的每块步长
+        self._warmup_blocks = max(1, int(warmup_seconds * sampling_rate / block_size))
+        self.reset()
+
+    def reset(self):
+        """清空状态（噪声基底重新估计），计数器一并清零"""
+        self._floor = None
+        self._blocks = 0
+        self._pending = np.empty((0, self.num_channels))  # 未凑满一块的样本（rms 为原始值，tkeo 为能量值）
+        self._previous = None  # tkeo 需要的上一块末尾两个样本
+        self._samples = 0
+        self._last_active = None  # 最近一个活动块末尾的样本序号
+        self.windows_total = 0
+        self.windows_gated = 0
+
+    def update(self, chunk):
+        """
+        送入一段数据，形状 (n, num_channels)
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self.method == "tkeo":
+            extended = chunk if self._previous is None else np.concatenate([self._previous, chunk])
+            if extended.shape[0] >= 2:
+                self._previous = extended[-2:]
+            if extended.shape[0] < 3:
+                values = np.empty((0, self.num_channels))
+            else:
+                # 每个样本的能量需要其后一个样本，整体滞后一个样本
+                values = np.square(extended[1:-1]) - extended[:-2] * extended[2:]
+        else:
+            values = chunk
+
+        values = np.concatenate([self._pending, values]) if self._pending.shape[0] else values
+        n_blocks = values.shape[0] // self.block_size
+        if n_blocks:
+            blocks = values[:n_blocks * self.block_size].reshape(n_blocks, self.block_size, self.num_channels)
+            if self.method == "tkeo":
+                energies = np.abs(blocks.mean(axis=1))
+            else:
+                energies = blocks.var(axis=1)
+            for energy in energies:
+                self._update_block(energy)
+        self._pending = values[n_blocks * self.block_size:]
+        self._samples += chunk.shape[0]
+
+    def _update_block(self, energy):
+        self._blocks += 1
+        block_end = self._blocks * self.block_size
+        if self._floor is None:
+            self._floor = energy.copy()
+        active = np.count_nonzero(energy > self.threshold_factor * self._floor) >= self.min_channels
+        if self._blocks <= self._warmup_blocks:
+            active = True  # 基底尚未收敛，保守地全部视为活动
+        if active:
+            self._last_active = block_end
+        # 下调快、上调慢的噪声基底
+        lower = energy < self._floor
+        self._floor[lower] = 0.5 * (self._floor[lower] + energy[lower])
+        self._floor[~lower] += self._rise * (energy[~lower] - self._floor[~lower])
+
+    def is_active(self, window_size):
+        """最近 window_size 个样本内是否有活动块（还没有完整块时视为活动）"""
+        if self._last_active is None:
+            return self._blocks == 0
+        return self._last_active > self._samples - window_size
+
+    def check(self, window_size):
+        """
+        判断当前窗口是否需要送入模型，并更新计数器
+        :return: True 需要推理；False 可以跳过
+        """
+        active = self.is_active(window_size)
+        self.windows_total += 1
+        if not active:
+            self.windows_gated += 1
+        return active
+
+    def rest_result(self):
+        """被门控窗口的识别结果（与 EMGGestureClassifier.predict 相同的字段）"""
+        return {"label": self.rest_label, "confidence": 1.0, "probabilities": {}}
+
+    @property
+    def noise_floor(self):
+        """各通道当前的噪声基底能量，尚无数据时为 None"""
+        return None if self._floor is None else self._floor.copy()
+
+    def stats(self):
+        """门控统计：窗口总数、跳过的窗口数及比例（即节省的模型推理比例）"""
+        return {
+            "windows": self.windows_total,
+            "gated": self.windows_gated,
+            "gated_fraction": self.windows_gated / self.windows_total if self.windows_total else 0.0,
+        }
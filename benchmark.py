@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import importlib.util
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from EMGGestureClassifier import EMGGestureClassifier, NUM_CHANNELS, standardize_windows
+from ringbuffer import TimedRingBuffer
+from acquisition import Subscription
+from instrumentation import Instrumentation
+
+# 性能基准套件：数据读取、切窗口、预处理、推理以及 GUI 刷新路径
+# 结果写成 JSON，可用 --compare 与之前的结果对比，发现性能回退
+#
+# 指标命名约定（--compare 据此判断方向）：
+#   *_ms / *_s   越小越好
+#   *_per_s      越大越好
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LETTERS = ['i', 'b', 'h', 'e']
+SECTIONS = ["load", "windowing", "inference", "pipeline", "gui"]
+
+
+def _timings(samples_ms):
+    """延迟分布摘要（毫秒）"""
+    samples_ms = np.asarray(samples_ms)
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return {"p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99),
+            "mean_ms": float(samples_ms.mean()), "n": int(samples_ms.size)}
+
+
+def _time_calls(fn, n_calls, warmup=5):
+    for _ in range(warmup):
+        fn()
+    samples = np.empty(n_calls)
+    for i in range(n_calls):
+        start = time.perf_counter()
+        fn()
+        samples[i] = (time.perf_counter() - start) * 1000
+    return _timings(samples)
+
+
+def bench_load_data(data_dir):
+    """datacache.load_data 冷启动（重建缓存）与热启动（memmap 打开）耗时"""
+    from datacache import load_data
+    cache_dir = tempfile.mkdtemp(prefix="emg_bench_cache_")
+    try:
+        start = time.perf_counter()
+        X, _ = load_data(data_dir, LETTERS, cache_dir)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        load_data(data_dir, LETTERS, cache_dir)
+        warm = time.perf_counter() - start
+        return {"windows": int(X.shape[0]), "cold_s": cold, "warm_s": warm}
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def bench_windowing(data_dir, csv_windows=50):
+    """segmentation.py 的切窗口吞吐量：从跨步视图取出并标准化，对比旧流程逐窗口写 CSV"""
+    from windowdataset import WindowedRecording, load_recording
+    data = np.ascontiguousarray(load_recording(data_dir, LETTERS[0]))
+    recording = WindowedRecording(data, label=0)
+
+    windows = recording.windows
+    start = time.perf_counter()
+    standardize_windows(windows)
+    materialize_s = time.perf_counter() - start
+
+    out_dir = tempfile.mkdtemp(prefix="emg_bench_seg_")
+    try:
+        start = time.perf_counter()
+        for i, window in enumerate(windows[:csv_windows]):
+            pd.DataFrame(window).to_csv(os.path.join(out_dir, f"w_{i:04d}.csv"), index=False, header=False)
+        csv_s = time.perf_counter() - start
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+    n = len(recording)
+    return {
+        "windows": n,
+        "materialize_windows_per_s": n / materialize_s,
+        "csv_export_windows_per_s": csv_windows / csv_s,
+    }
+
+
+def bench_single_window(classifier, window, n_calls):
+    """preprocess 与 predict 的单窗口延迟分布"""
+    processed = classifier.preprocess(window)
+    return {
+        "preprocess": _time_calls(lambda: classifier.preprocess(window), n_calls),
+        "predict": _time_calls(lambda: classifier.predict(processed), n_calls),
+    }
+
+
+def bench_batch_throughput(classifier, windows, batch_sizes):
+    """批量推理吞吐量随 batch_size 的变化"""
+    results = {}
+    processed = classifier.preprocess_batch(windows)
+    classifier.predict_batch(processed[:max(batch_sizes)], batch_size=max(batch_sizes))  # 预热
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        classifier.predict_batch(classifier.preprocess_batch(windows), batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results[str(batch_size)] = {"total_s": elapsed, "windows_per_s": windows.shape[0] / elapsed}
+    return results
+
+
+def bench_pipeline(model, backend, data_dir, speed, duration_s, hop=500, samples_per_read=200):
+    """
+    无 GUI、无 NI 设备的端到端测试：回放 i/b/h/e 录音（speed 倍速）-> 采集线程 -> 流式识别
+    与 GestureRecognitionController 相同的读取方式，测量吞吐量和各阶段延迟
+    """
+    from daqsource import create_source
+    from acquisition import AcquisitionThread
+    from streamrecognizer import StreamingGestureRecognizer
+
+    instrumentation = Instrumentation()
+    classifier = EMGGestureClassifier(model, backend=backend, instrumentation=instrumentation)
+    recognizer = StreamingGestureRecognizer(classifier, hop=hop)
+    source = create_source("replay", base_dir=data_dir, speed=speed)
+    acquisition = AcquisitionThread(source, num_channels=source.num_channels, samples_per_read=samples_per_read,
+                                    sampling_rate=source.sampling_rate, instrumentation=instrumentation)
+    subscription = acquisition.subscribe("benchmark", maxsize=max(1, int(5 * source.sampling_rate / samples_per_read)))
+    source.start()
+    acquisition.start()
+    cursor = windows = dropped = 0
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < duration_s:
+            item = subscription.get(timeout=0.5)
+            if item is None:
+                continue
+            first, data = item
+            if first > cursor:
+                dropped += first - cursor
+                recognizer.reset()
+            cursor = first + data.shape[0]
+            windows += len(recognizer.push(data))
+        elapsed = time.perf_counter() - start
+    finally:
+        acquisition.stop(timeout=1.0)
+        source.close()
+
+    latency = {name: {"p50_ms": stats["p50_ms"], "p99_ms": stats["p99_ms"]}
+               for name, stats in instrumentation.snapshot().items() if name != "daq_read"}
+    return {
+        "speed": speed,
+        "samples_per_s": cursor / elapsed,
+        "windows_per_s": windows / elapsed,
+        "dropped_samples": dropped,  # 识别跟不上时被丢弃的样本数，应为 0
+        "latency": latency,
+    }
+
+
+def _load_mainwindow_module():
+    """Mainwindow_3.0.py 文件名含点号，只能按路径加载"""
+    spec = importlib.util.spec_from_file_location("mainwindow", os.path.join(BASE_DIR, "Mainwindow_3.0.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_gui(n_ticks, samples_per_read=200, sampling_rate=1000, max_display_points=1000):
+    """
+    无显示环境下（Qt offscreen）测量 GUI 每次刷新的开销：
+    MainWindow.read_real_data 的缓冲区更新，以及 MultiChannelWaveformDisplay.update_waveforms
+    """
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    module = _load_mainwindow_module()
+    app = module.QApplication.instance() or module.QApplication(sys.argv)
+    rng = np.random.default_rng(0)
+
+    class NullDisplay:
+        def update_waveforms(self, time_axis, data):
+            pass
+
+    chunk = rng.standard_normal((samples_per_read, NUM_CHANNELS)).astype(np.float32)
+    chunk.flags.writeable = False  # 与采集线程发布的数据块相同
+
+    def time_buffer_update(display_points):
+        # 不构造 MainWindow（会打开 NI 设备），只提供 read_real_data 用到的属性；
+        # 采集线程以同一订阅代替，每次刷新前发布 samples_per_read 个合成样本
+        subscription = Subscription("display", maxsize=-(-display_points // samples_per_read) + 1)
+        window = SimpleNamespace(
+            display_subscription=subscription, sampling_rate=sampling_rate, time_counter=0,
+            max_display_points=display_points, display_cursor=0,
+            history=TimedRingBuffer(display_points, NUM_CHANNELS, sampling_rate), waveform_display=NullDisplay())
+        published = 0
+
+        def tick():
+            nonlocal published
+            subscription.put(published, chunk)
+            published += chunk.shape[0]
+            module.MainWindow.read_real_data(window)
+
+        return _time_calls(tick, n_ticks)
+
+    buffer_update = time_buffer_update(max_display_points)
+    # 显示历史 60 秒时的开销，应与 1 秒时基本相同
+    buffer_update_long = time_buffer_update(60 * sampling_rate)
+
+    def time_waveform_update(render_mode, display_points):
+        # 帧率不设上限，测量每次实际绘制的开销
+        display = module.MultiChannelWaveformDisplay(num_channels=NUM_CHANNELS, render_mode=render_mode,
+                                                     max_fps=float("inf"))
+        display.resize(1200, 600)
+        display.show()
+        time_axis = np.arange(display_points) / sampling_rate
+        data = rng.standard_normal((NUM_CHANNELS, display_points))
+
+        def update():
+            display.update_waveforms(time_axis, data)
+            app.processEvents()
+
+        try:
+            return _time_calls(update, n_ticks)
+        finally:
+            display.close()
+
+    return {"read_real_data_buffer_update": buffer_update, "read_real_data_buffer_update_60s": buffer_update_long,
+            "update_waveforms": time_waveform_update("decimated", max_display_points),
+            "update_waveforms_60s": time_waveform_update("decimated", 60 * sampling_rate),
+            "update_waveforms_raw_60s": time_waveform_update("raw", 60 * sampling_rate),
+            "max_display_points": max_display_points}
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(results, prefix=""):
+    """把嵌套结果展开为 "a.b.c" -> 数值"""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, name + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current, baseline, threshold):
+    """
+    与基线结果对比，返回性能回退超过 threshold（比例）的指标列表
+    :return: [(指标名, 基线值, 当前值, 变化比例)]
+    """
+    current, baseline = _flatten(current["results"]), _flatten(baseline["results"])
+    regressions = []
+    for name, value in current.items():
+        old = baseline.get(name)
+        if not old:
+            continue
+        if name.endswith("_per_s"):
+            change = (old - value) / old
+        elif name.endswith("_ms") or name.endswith("_s"):
+            change = (value - old) / old
+        else:
+            continue
+        if change > threshold:
+            regressions.append((name, old, value, change))
+    return regressions
+
+
+def run(args):
+    results = {}
+    sections = set(args.only or SECTIONS)
+
+    def section(name, fn):
+        if name not in sections:
+            return
+        print(f"[{name}] ...", flush=True)
+        try:
+            results[name] = fn()
+        except (ImportError, OSError) as e:
+            # 只在缺少 TensorFlow / Qt 等依赖或模型、数据文件时跳过该部分；其他异常是真实错误，直接抛出
+            results[name] = {"skipped": f"{type(e).__name__}: {e}"}
+            print(f"[{name}] 跳过: {results[name]['skipped']}")
+
+    section("load", lambda: bench_load_data(args.data_dir))
+    section("windowing", lambda: bench_windowing(args.data_dir))
+
+    def inference():
+        from benchmark_batch import load_windows
+        classifier = EMGGestureClassifier(args.model, backend=args.backend)
+        windows = load_windows(args.data_dir, LETTERS, args.windows)
+        return {
+            "backend": args.backend,
+            "single_window": bench_single_window(classifier, windows[0], args.calls),
+            "batch_throughput": bench_batch_throughput(classifier, windows, args.batch_sizes),
+        }
+
+    section("inference", inference)
+    section("pipeline", lambda: bench_pipeline(args.model, args.backend, args.data_dir, args.pipeline_speed,
+                                               args.pipeline_seconds))
+    section("gui", lambda: bench_gui(args.calls))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EMG 手势识别性能基准")
+    parser.add_argument("--data-dir", default=BASE_DIR)
+    parser.add_argument("--model", default="emg_gesture_model")
+    parser.add_argument("--backend", default="keras", choices=["keras", "numpy", "tflite"])
+    parser.add_argument("--only", nargs="+", choices=SECTIONS)
+    parser.add_argument("--calls", type=int, default=200, help="延迟分布的采样次数")
+    parser.add_argument("--windows", type=int, default=512, help="批量吞吐量测试的窗口数")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128, 512])
+    parser.add_argument("--pipeline-speed", type=float, default=10.0, help="端到端测试的回放倍速")
+    parser.add_argument("--pipeline-seconds", type=float, default=10.0, help="端到端测试的运行时长（秒）")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", help="基线结果 JSON，对比并报告性能回退")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为回退的变化比例")
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, old, new, change in regressions:
+            print(f"回退: {name} {old:.4g} -> {new:.4g} ({change:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print("未发现性能回退")
@@ -0,0 +1,69 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from EMGGestureClassifier import EMGGestureClassifier, WINDOW_SIZE, NUM_CHANNELS
+
+# 单窗口循环 与 批量推理 的吞吐量对比
+
+
+def load_windows(base_dir, letters, num_windows):
+    """从 i/b/h/e 分段目录中读取窗口数据，不足时用随机数据补齐"""
+    windows = []
+    per_letter = max(1, num_windows // len(letters))
+    for letter in letters:
+        letter_dir = os.path.join(base_dir, letter)
+        if not os.path.isdir(letter_dir):
+            continue
+        files = sorted(f for f in os.listdir(letter_dir) if f.endswith('.csv'))[:per_letter]
+        for file in files:
+            df = pd.read_csv(os.path.join(letter_dir, file), header=None)
+            if df.shape == (WINDOW_SIZE, NUM_CHANNELS):
+                windows.append(df.values)
+    windows = windows[:num_windows]
+    if len(windows) < num_windows:
+        windows.extend(np.random.randn(num_windows - len(windows), WINDOW_SIZE, NUM_CHANNELS))
+    return np.array(windows)
+
+
+def bench_single_loop(classifier, raw_batch):
+    """逐窗口调用 preprocess + predict"""
+    start = time.perf_counter()
+    labels = []
+    for raw in raw_batch:
+        labels.append(classifier.predict(classifier.preprocess(raw))["label"])
+    return time.perf_counter() - start, np.array(labels)
+
+
+def bench_batch(classifier, raw_batch, batch_size):
+    """一次性调用 preprocess_batch + predict_batch"""
+    start = time.perf_counter()
+    result = classifier.predict_batch(classifier.preprocess_batch(raw_batch), batch_size=batch_size)
+    return time.perf_counter() - start, result["labels"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="单窗口与批量推理吞吐量对比")
+    parser.add_argument("--model", default="emg_gesture_model")
+    parser.add_argument("--data-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--windows", type=int, default=512)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 128, 512])
+    args = parser.parse_args()
+
+    classifier = EMGGestureClassifier(args.model)
+    raw_batch = load_windows(args.data_dir, ['i', 'b', 'h', 'e'], args.windows)
+    n = raw_batch.shape[0]
+
+    # 预热，排除首次调用时的图构建开销
+    classifier.predict(classifier.preprocess(raw_batch[0]))
+    classifier.predict_batch(classifier.preprocess_batch(raw_batch[:2]))
+
+    loop_time, loop_labels = bench_single_loop(classifier, raw_batch)
+    print(f"单窗口循环: {n} 个窗口, {loop_time:.3f} 秒, {n / loop_time:.1f} 窗口/秒")
+
+    for batch_size in args.batch_sizes:
+        batch_time, batch_labels = bench_batch(classifier, raw_batch, batch_size)
+        agreement = np.mean(batch_labels == loop_labels)
+        print(f"批量推理 (batch_size={batch_size}): {batch_time:.3f} 秒, "
+              f"{n / batch_time:.1f} 窗口/秒, 加速 {loop_time / batch_time:.1f}x, 结果一致率 {agreement:.2%}")
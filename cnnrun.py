@@ -1,75 +1,57 @@
 import tensorflow as tf
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import Conv1D, MaxPooling1D, Flatten, Dense, Dropout, BatchNormalization
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder
 import numpy as np
-import pandas as pd
-import os
+from windowdataset import WindowedDataset
+from modelvariants import VARIANTS, build_model, evaluate_variant, write_manifest, print_table
 
-# 数据加载函数
-def load_data(base_dir, letters):
-    X = []
-    y = []
-    for label, letter in enumerate(letters):
-        letter_dir = os.path.join(base_dir, letter)
-        for file in os.listdir(letter_dir):
-            if file.endswith('.csv'):
-                file_path = os.path.join(letter_dir, file)
-                df = pd.read_csv(file_path, header=None)
-                if df.shape[0] == 3000:  # 确保数据完整
-                    # 数据标准化（按通道）
-                    data = df.values.astype(np.float32)
-                    for channel in range(4):
-                        data[:, channel] = (data[:, channel] - np.mean(data[:, channel])) / np.std(data[:, channel])
-                    X.append(data)
-                    y.append(label)
-    return np.array(X), np.array(y)
-
-# 加载数据
+# 加载数据（连续录音 + 滑动窗口视图，窗口长度 3000、步长 500）；
+# 由分段 CSV 拼回的录音缓存在 base_dir/.emg_cache，之后以 memmap 打开
 base_dir = "D:/develop/pythonSample/EMGGNN"
 letters = ['i', 'b', 'h', 'e']
-X, y = load_data(base_dir, letters)
+dataset = WindowedDataset.from_base_dir(base_dir, letters)
+y = dataset.labels
 
-# 划分训练集和测试集
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
+# 划分训练集和测试集（按窗口序号划分，只为选中的窗口复制并标准化数据）
+train_idx, test_idx = train_test_split(
+    np.arange(len(dataset)), test_size=0.2, random_state=42, stratify=y
 )
+X_train, X_test = dataset.normalized(train_idx), dataset.normalized(test_idx)
+y_train, y_test = y[train_idx], y[test_idx]
 
 # 转换为One-hot编码
 y_train = tf.keras.utils.to_categorical(y_train, 4)
 y_test = tf.keras.utils.to_categorical(y_test, 4)
 
-# 构建CNN模型
-model = Sequential([
-    Conv1D(32, 5, activation='relu', input_shape=(3000, 4)),
-    BatchNormalization(),
-    MaxPooling1D(2),
-    Conv1D(64, 5, activation='relu'),
-    BatchNormalization(),
-    MaxPooling1D(2),
-    Flatten(),
-    Dense(128, activation='relu'),
-    Dropout(0.5),
-    Dense(4, activation='softmax')
-])
-
-# 编译模型
-model.compile(
-    optimizer='adam',
-    loss='categorical_crossentropy',
-    metrics=['accuracy']
-)
-
-# 训练模型
-history = model.fit(
-    X_train, y_train,
-    epochs=150,
-    batch_size=32,
-    validation_data=(X_test, y_test),
-    verbose=1
-)
-
-# 评估模型
-loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
-print(f"测试准确率: {accuracy:.4f}")
\ No newline at end of file
+# 依次训练基线模型和各紧凑变体（见 modelvariants.py），保存到 output_dir 并写出对比清单 variants.json
+output_dir = "model_variants"
+variants = list(VARIANTS)
+rows = []
+for name in variants:
+    model = build_model(name)
+
+    # 编译模型
+    model.compile(
+        optimizer='adam',
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+
+    # 训练模型
+    history = model.fit(
+        X_train, y_train,
+        epochs=150,
+        batch_size=32,
+        validation_data=(X_test, y_test),
+        verbose=1
+    )
+
+    # 评估模型
+    loss, accuracy = model.evaluate(X_test, y_test, verbose=0)
+    print(f"{name} 测试准确率: {accuracy:.4f}")
+
+    # 保存 SavedModel 和 .npz，测量参数量、文件大小和 CPU 单窗口延迟
+    rows.append(evaluate_variant(name, model, output_dir, X_test, np.argmax(y_test, axis=1)))
+
+print(f"清单已写入: {write_manifest(rows, output_dir)}")
+print_table(rows)
@@ -0,0 +1,193 @@
+import os
+import time
+import numpy as np
+
+# 采集数据源：与 nidaqmx.Task 相同的 start / read / stop / close 接口，
+# read(number_of_samples_per_channel) 返回形状 (通道, 样本) 的数组并按采样率阻塞。
+# 没有 NI 设备时可用回放或合成数据源运行、测试整个采集-显示-识别流程，也可以加速回放做压力测试。
+
+SOURCE_KINDS = ("ni", "replay", "synthetic")
+
+
+class AcquisitionSource:
+    """数据源基类：按实时（或 speed 倍速）节奏输出数据"""
+
+    def __init__(self, num_channels, sampling_rate, speed=1.0):
+        """
+        :param num_channels: 通道数
+        :param sampling_rate: 采样率（Hz）
+        :param speed: 相对实时的倍速，0 表示不限速（尽快输出）
+        """
+        self.num_channels = num_channels
+        self.sampling_rate = sampling_rate
+        self.speed = speed
+        self.finished = False  # 数据源已耗尽（只有不循环的回放会出现）
+        self._position = 0  # 已输出的样本数
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+        self._position = 0
+
+    def stop(self):
+        self._t0 = None
+
+    def close(self):
+        self.stop()
+
+    def read(self, number_of_samples_per_channel):
+        """
+        读取 n 个样本，按采样率节奏阻塞到这些样本"采集完成"的时刻
+        :return: 形状 (num_channels, n) 的数组，数据源耗尽时可能少于 n
+        """
+        n = number_of_samples_per_channel
+        if self._t0 is None:
+            self.start()
+        if self.speed:
+            due = self._t0 + (self._position + n) / (self.sampling_rate * self.speed)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        data = self._generate(n)
+        self._position += data.shape[0]
+        return data.T
+
+    def _generate(self, n):
+        """生成接下来的 n 个样本，形状 (n, num_channels)"""
+        raise NotImplementedError
+
+
+class NIDAQSource:
+    """NI-DAQmx 设备（原 MainWindow 中直接创建的 Task），读取由设备时钟节奏控制"""
+
+    def __init__(self, device="Dev1/ai0:3", sampling_rate=1000, buffer_size=1000):
+        """
+        :param device: 物理通道，如 "Dev1/ai0:3"
+        :param buffer_size: 设备端缓冲区大小（每通道样本数）
+        """
+        from nidaqmx import Task
+        from nidaqmx.constants import AcquisitionType
+        self.sampling_rate = sampling_rate
+        self.finished = False
+        self.task = Task()
+        self.task.ai_channels.add_ai_voltage_chan(device)
+        self.num_channels = len(self.task.ai_channels.channel_names)
+        self.task.timing.cfg_samp_clk_timing(
+            rate=sampling_rate,
+            sample_mode=AcquisitionType.CONTINUOUS,
+            samps_per_chan=buffer_size
+        )
+
+    def start(self):
+        self.task.start()
+
+    def stop(self):
+        self.task.stop()
+
+    def close(self):
+        self.task.close()
+
+    def read(self, number_of_samples_per_channel):
+        return np.asarray(self.task.read(number_of_samples_per_channel=number_of_samples_per_channel))
+
+
+class ReplaySource(AcquisitionSource):
+    """回放一段录音，可循环、可加速"""
+
+    def __init__(self, data, sampling_rate=2000, speed=1.0, loop=True):
+        """
+        :param data: 形状 (T, C) 的录音（ndarray 或 memmap）
+        :param loop: 播放到末尾后是否从头循环
+        """
+        data = np.asarray(data)
+        if data.ndim != 2 or data.shape[0] == 0:
+            raise ValueError(f"录音数据形状需为 (T, C) 且不为空，当前形状: {data.shape}")
+        super().__init__(data.shape[1], sampling_rate, speed)
+        self.data = data
+        self.loop = loop
+
+    @classmethod
+    def from_file(cls, path, sampling_rate=None, **kwargs):
+        """
+        从文件创建：.emgrec（recorder.py 记录，采样率取自文件头）、.npy 或无表头的 .csv（T 行 x C 列）
+        :param sampling_rate: 采样率，默认 .emgrec 取文件头，其他格式为 2000（dataread.py 的采样率）
+        """
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".emgrec":
+            from recorder import read_recording
+            header, data = read_recording(path)
+            sampling_rate = sampling_rate or header["sampling_rate"]
+        elif ext == ".npy":
+            data = np.load(path, mmap_mode="r")
+        elif ext == ".csv":
+            import pandas as pd
+            data = pd.read_csv(path, header=None, dtype=np.float32).values
+        else:
+            raise ValueError(f"不支持的录音格式: {path}")
+        return cls(data, sampling_rate or 2000, **kwargs)
+
+    @classmethod
+    def from_letters(cls, base_dir, letters=("i", "b", "h", "e"), sampling_rate=2000, **kwargs):
+        """依次拼接各手势的连续录音（见 windowdataset.load_recording）后回放"""
+        from windowdataset import load_recording
+        data = np.concatenate([load_recording(base_dir, letter) for letter in letters])
+        return cls(data, sampling_rate, **kwargs)
+
+    def _generate(self, n):
+        total = self.data.shape[0]
+        if not self.loop:
+            start = min(self._position, total)
+            if start + n >= total:
+                self.finished = True
+            return np.array(self.data[start:start + n])
+        index = (self._position + np.arange(n)) % total
+        return np.asarray(self.data[index])
+
+
+class SyntheticSource(AcquisitionSource):
+    """合成肌电信号：低幅度背景噪声上周期性叠加收缩爆发（随机噪声按包络调制）"""
+
+    def __init__(self, num_channels=4, sampling_rate=1000, speed=1.0, noise=0.02, amplitude=0.5,
+                 period=4.0, burst=2.0, seed=0):
+        """
+        :param noise: 背景噪声标准差（V）
+        :param amplitude: 收缩时的信号标准差（V）
+        :param period: 两次收缩开始的间隔（秒）
+        :param burst: 每次收缩持续时间（秒）
+        :param seed: 随机种子，相同参数输出相同序列
+        """
+        super().__init__(num_channels, sampling_rate, speed)
+        self.noise = noise
+        self.amplitude = amplitude
+        self.period = period
+        self.burst = burst
+        self._rng = np.random.default_rng(seed)
+        # 各通道的激活程度不同
+        self._gains = np.linspace(1.0, 0.4, num_channels)
+
+    def _generate(self, n):
+        t = (self._position + np.arange(n)) / self.sampling_rate
+        phase = t % self.period
+        # 收缩期内为半周期正弦包络，其余时间为 0
+        envelope = np.where(phase < self.burst, np.sin(np.pi * np.minimum(phase, self.burst) / self.burst), 0.0)
+        signal = self._rng.standard_normal((n, self.num_channels))
+        return (self.noise + self.amplitude * envelope[:, None] * self._gains) * signal
+
+
+def create_source(kind="ni", **kwargs):
+    """
+    按名称创建数据源
+    :param kind: "ni" NI 设备；"replay" 回放录音（path 指定文件，否则回放 base_dir 下的 i/b/h/e）；"synthetic" 合成信号
+    :param kwargs: 传给对应数据源的参数
+    """
+    if kind == "ni":
+        return NIDAQSource(**kwargs)
+    if kind == "replay":
+        path = kwargs.pop("path", None)
+        if path:
+            return ReplaySource.from_file(path, **kwargs)
+        base_dir = kwargs.pop("base_dir", os.path.dirname(os.path.abspath(__file__)))
+        return ReplaySource.from_letters(base_dir, **kwargs)
+    if kind == "synthetic":
+        return SyntheticSource(**kwargs)
+    raise ValueError(f"不支持的数据源: {kind}，可选 {SOURCE_KINDS}")
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from EMGGestureClassifier import WINDOW_SIZE, NUM_CHANNELS, standardize_windows
+from parallelio import iter_windows
+
+# 训练数据缓存：把 i/b/h/e 目录下的分段 CSV 一次性打包成连续的 float32 数组（.npy）和标签数组，
+# 之后通过 memmap 打开，不再逐个解析 CSV。源文件的大小或修改时间变化时自动重建。
+
+CACHE_VERSION = 1
+DEFAULT_CACHE_DIR = ".emg_cache"
+
+
+def _scan_sources(base_dir, letters):
+    """列出所有源 CSV 文件及其大小、修改时间（按字母、文件名排序，保证顺序稳定）"""
+    sources = []
+    for label, letter in enumerate(letters):
+        letter_dir = os.path.join(base_dir, letter)
+        for file in sorted(os.listdir(letter_dir)):
+            if file.endswith('.csv'):
+                stat = os.stat(os.path.join(letter_dir, file))
+                sources.append({
+                    "path": f"{letter}/{file}",
+                    "label": label,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                })
+    return sources
+
+
+def _cache_paths(cache_dir):
+    return (os.path.join(cache_dir, "X.npy"),
+            os.path.join(cache_dir, "y.npy"),
+            os.path.join(cache_dir, "manifest.json"))
+
+
+def read_manifest(manifest_path):
+    """读取缓存清单，不存在或损坏时返回 None"""
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_manifest(manifest_path, letters, sources, **params):
+    """
+    写入缓存清单（数据文件全部替换完成后调用）
+    :param sources: 构建缓存前扫描的源文件列表（见 _scan_sources）
+    :param params: 与缓存内容有关的其他参数，校验时需逐项一致
+    :return: 清单字典
+    """
+    manifest = {
+        "version": CACHE_VERSION,
+        "letters": list(letters),
+        "window_size": WINDOW_SIZE,
+        **params,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "sources": sources,
+    }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    return manifest
+
+
+def _is_manifest_valid(manifest_path, data_paths, base_dir, letters, **params):
+    """缓存存在，且字母顺序、窗口长度、其他参数以及所有源文件的大小和修改时间都与清单一致"""
+    manifest = read_manifest(manifest_path)
+    if manifest is None or manifest.get("version") != CACHE_VERSION:
+        return False
+    if manifest.get("letters") != list(letters) or manifest.get("window_size") != WINDOW_SIZE:
+        return False
+    if any(manifest.get(key) != value for key, value in params.items()):
+        return False
+    if not all(os.path.exists(p) for p in data_paths):
+        return False
+    return manifest["sources"] == _scan_sources(base_dir, letters)
+
+
+def is_cache_valid(base_dir, letters, cache_dir):
+    """窗口缓存是否可用（见 _is_manifest_valid）"""
+    x_path, y_path, manifest_path = _cache_paths(cache_dir)
+    return _is_manifest_valid(manifest_path, (x_path, y_path), base_dir, letters)
+
+
+def build_cache(base_dir, letters, cache_dir, workers=None):
+    """
+    解析所有源 CSV 并写入缓存，窗口逐块写入 memmap，内存占用与数据集大小无关
+    :param workers: 并行解析的进程数，默认 os.cpu_count()
+    :return: 缓存清单字典
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    x_path, y_path, manifest_path = _cache_paths(cache_dir)
+    sources = _scan_sources(base_dir, letters)
+
+    # 先写临时文件，全部完成后再替换，中途失败不会留下半成品缓存
+    x_tmp, y_tmp = x_path + ".tmp.npy", y_path + ".tmp.npy"
+    X = np.lib.format.open_memmap(x_tmp, mode="w+", dtype=np.float32,
+                                  shape=(len(sources), WINDOW_SIZE, NUM_CHANNELS))
+    y = np.empty(len(sources), dtype=np.int64)
+    labels = np.array([source["label"] for source in sources], dtype=np.int64)
+    paths = [os.path.join(base_dir, source["path"]) for source in sources]
+    count = 0
+    offset = 0
+    for chunk, data, valid in iter_windows(paths, workers=workers):
+        # 形状不完整的文件被跳过；数据标准化（按窗口、按通道）
+        n = int(valid.sum())
+        X[count:count + n] = standardize_windows(data[valid])
+        y[count:count + n] = labels[offset:offset + len(chunk)][valid]
+        count += n
+        offset += len(chunk)
+    X.flush()
+    del X
+    np.save(y_tmp, y[:count])
+
+    os.replace(x_tmp, x_path)
+    os.replace(y_tmp, y_path)
+    # X.npy 前 num_windows 个窗口有效
+    return _write_manifest(manifest_path, letters, sources,
+                           num_channels=NUM_CHANNELS, num_windows=count, normalized=True)
+
+
+def load_data(base_dir, letters, cache_dir=None, rebuild=False, workers=None):
+    """
+    读取训练数据（与 cnnrun.load_data 返回相同的标准化窗口和标签）
+    :param base_dir: 包含 i/b/h/e 分段目录的数据根目录
+    :param letters: 类别字母列表，顺序决定标签编号
+    :param cache_dir: 缓存目录，默认 base_dir/.emg_cache
+    :param rebuild: 为 True 时强制重建缓存
+    :param workers: 重建缓存时并行解析的进程数，默认 os.cpu_count()
+    :return: (X, y)，X 为只读 memmap，形状 (N, 3000, 4)；y 形状 (N,)
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(base_dir, DEFAULT_CACHE_DIR)
+    x_path, y_path, manifest_path = _cache_paths(cache_dir)
+    if rebuild or not is_cache_valid(base_dir, letters, cache_dir):
+        manifest = build_cache(base_dir, letters, cache_dir, workers)
+    else:
+        manifest = read_manifest(manifest_path)
+    count = manifest["num_windows"]
+    X = np.load(x_path, mmap_mode="r")[:count]
+    y = np.load(y_path)
+    return X, y
+
+
+def _recording_paths(cache_dir, letter, hop):
+    name = f"recording_{letter}_hop{hop}"
+    return os.path.join(cache_dir, f"{name}.npy"), os.path.join(cache_dir, f"{name}.json")
+
+
+def is_recording_cache_valid(base_dir, letter, hop, cache_dir):
+    """连续录音缓存是否可用（与窗口缓存使用同一校验，另外要求拼接步长一致）"""
+    npy_path, manifest_path = _recording_paths(cache_dir, letter, hop)
+    return _is_manifest_valid(manifest_path, (npy_path,), base_dir, [letter], hop=hop)
+
+
+def build_recording_cache(base_dir, letter, build, hop, cache_dir):
+    """
+    调用 build 拼接连续录音并写入缓存
+    :return: 缓存清单字典
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    npy_path, manifest_path = _recording_paths(cache_dir, letter, hop)
+    sources = _scan_sources(base_dir, [letter])
+    tmp_path = npy_path + ".tmp.npy"
+    np.save(tmp_path, np.ascontiguousarray(build(), dtype=np.float32))
+    os.replace(tmp_path, npy_path)
+    return _write_manifest(manifest_path, [letter], sources, hop=hop)
+
+
+def load_cached_recording(base_dir, letter, build, hop, cache_dir=None, rebuild=False):
+    """
+    读取由 {letter}/ 分段窗口 CSV 拼回的连续录音缓存（windowdataset.load_recording 使用），
+    与窗口缓存相同，源文件的大小或修改时间变化时自动重建
+    :param build: 缓存失效时调用，返回形状 (T, C) 的连续录音
+    :param hop: 拼接时使用的窗口步长，不同步长分别缓存
+    :param cache_dir: 缓存目录，默认 base_dir/.emg_cache
+    :param rebuild: 为 True 时强制重建缓存
+    :return: 只读 memmap，形状 (T, C)
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(base_dir, DEFAULT_CACHE_DIR)
+    if rebuild or not is_recording_cache_valid(base_dir, letter, hop, cache_dir):
+        build_recording_cache(base_dir, letter, build, hop, cache_dir)
+    return np.load(_recording_paths(cache_dir, letter, hop)[0], mmap_mode="r")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="构建 / 检查训练数据缓存")
+    parser.add_argument("--data-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--cache-dir")
+    parser.add_argument("--rebuild", action="store_true", help="忽略现有缓存强制重建")
+    parser.add_argument("--workers", type=int, help="并行解析的进程数，默认 CPU 核数")
+    args = parser.parse_args()
+
+    letters = ['i', 'b', 'h', 'e']
+    start = time.perf_counter()
+    X, y = load_data(args.data_dir, letters, args.cache_dir, rebuild=args.rebuild, workers=args.workers)
+    print(f"{X.shape[0]} 个窗口, 标签分布 {np.bincount(y).tolist()}, 耗时 {time.perf_counter() - start:.3f} 秒")
@@ -1,4 +1,5 @@
 import pandas as pd
+import numpy as np
 
 # 定义文件路径
 file_paths = {
@@ -8,51 +9,51 @@ file_paths = {
     'FrontOutside': r"C:\Users\Tenglong\OneDrive\桌面\手势肌电\FrontOutside_1.csv"
 }
 
-# 读取四个通道的数据，假设每个文件只有一列数据
+# 采集协议：每 16 秒一个循环，i/b/h/e 依次在循环内第 0/4/8/12 秒开始，各持续 2 秒
+sampling_rate = 2000
+cycle_seconds = 16
+gesture_seconds = 2
+letter_offsets = {'i': 0, 'b': 4, 'h': 8, 'e': 12}
+total_duration = 512  # 秒，设为 None 时按录音实际长度提取所有完整循环（多段长录音）
+# 输出格式："csv" 与原流程一致（segmentation.py 的输入）；"npy" 为 float32 二进制，读写更快
+output_format = "csv"
+
+# 读取四个通道的数据，每个文件只有一列数据，各读取一次后按列拼成 (样本, 通道) 数组
 channels = {}
 for name, path in file_paths.items():
-    channels[name] = pd.read_csv(path, header=None, names=[name])
+    channels[name] = pd.read_csv(path, header=None, names=[name])[name].to_numpy()
+num_rows = min(len(channel) for channel in channels.values())
+all_channels = np.column_stack([channel[:num_rows] for channel in channels.values()])
 
 # 生成每个字母的时间段
-def get_intervals(letter):
-    intervals = []
-    for k in range(32):  # k从0到31
-        if letter == 'i':
-            start = 0 + 16 * k
-            end = 2 + 16 * k
-        elif letter == 'b':
-            start = 4 + 16 * k
-            end = 6 + 16 * k
-        elif letter == 'h':
-            start = 8 + 16 * k
-            end = 10 + 16 * k
-        elif letter == 'e':
-            start = 12 + 16 * k
-            end = 14 + 16 * k
-        # 确保时间不超过512秒
-        if end <= 512:
-            intervals.append((start, end))
-    return intervals
+def get_intervals(letter, duration):
+    """
+    :param letter: 手势字母
+    :param duration: 协议总时长（秒），只保留结束时间不超过该时长的时间段
+    :return: (起始秒数数组, 结束秒数数组)
+    """
+    starts = letter_offsets[letter] + cycle_seconds * np.arange(int(duration // cycle_seconds) + 1)
+    ends = starts + gesture_seconds
+    keep = ends <= duration
+    return starts[keep], ends[keep]
+
+duration = num_rows / sampling_rate if total_duration is None else min(total_duration, num_rows / sampling_rate)
+segment_rows = gesture_seconds * sampling_rate
 
 # 处理每个字母
 for letter in ['i', 'b', 'h', 'e']:
-    intervals = get_intervals(letter)
-    all_data = pd.DataFrame()
-    
-    for start_sec, end_sec in intervals:
-        start_row = int(start_sec * 2000)
-        end_row = int(end_sec * 2000)
-        
-        # 提取各通道数据并合并
-        segments = []
-        for channel in channels.values():
-            segment = channel.iloc[start_row:end_row].reset_index(drop=True)
-            segments.append(segment)
-        combined = pd.concat(segments, axis=1)
-        
-        all_data = pd.concat([all_data, combined], ignore_index=True)
-    
-    # 保存为CSV文件
-    output_path = f'{letter}.csv'
-    all_data.to_csv(output_path, index=False, header=False)
-    print(f'字母 {letter} 的数据已保存到 {output_path}')
\ No newline at end of file
+    starts, _ = get_intervals(letter, duration)
+    start_rows = (starts * sampling_rate).astype(np.int64)
+
+    # 一次性计算所有时间段的行号，并用一次花式索引取出 (时间段数 * 4000, 4) 的数据
+    row_index = (start_rows[:, None] + np.arange(segment_rows)).ravel()
+    all_data = all_channels[row_index]
+
+    # 一次写出整个文件
+    if output_format == "npy":
+        output_path = f'{letter}.npy'
+        np.save(output_path, all_data.astype(np.float32))
+    else:
+        output_path = f'{letter}.csv'
+        pd.DataFrame(all_data).to_csv(output_path, index=False, header=False)
+    print(f'字母 {letter} 的数据已保存到 {output_path}')
@@ -0,0 +1,265 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from EMGGestureClassifier import EMGGestureClassifier, NUM_CHANNELS, SAMPLING_RATE
+from instrumentation import DISABLED
+from ringbuffer import MultiChannelRingBuffer
+from windowdataset import WindowedRecording, WindowedDataset, load_recording, DEFAULT_HOP
+
+# 短窗口提前决策：固定 1.5 秒窗口的模型要在动作开始 1.5 秒后才能给出结果。
+# 这里用同一批 i/b/h/e 连续录音按 0.5 / 0.75 / 1.0 / 1.5 秒切窗口，分别训练模型；
+# 流式识别时从最短的窗口开始尝试，置信度达到阈值就立即输出，否则等数据够长后换更长窗口的模型，
+# 最长窗口的模型总是给出结果（回退）。输出后从该时刻开始下一次决策。
+#
+# 每段录音末尾的 test_size 部分留作测试，任何窗口长度的训练窗口都不与它重叠，
+# decision_report 在这部分数据上统计决策时间（time-to-decision）的分布与准确率。
+
+WINDOW_SECONDS = (0.5, 0.75, 1.0, 1.5)
+
+
+def split_recording(data, test_size=0.2):
+    """把一段连续录音按时间切成训练部分和测试部分（测试部分在末尾）"""
+    cut = int(round(data.shape[0] * (1 - test_size)))
+    return data[:cut], data[cut:]
+
+
+def train_window_models(base_dir, output_dir, letters=('i', 'b', 'h', 'e'), seconds=WINDOW_SECONDS, variant="gap",
+                        epochs=50, hop=DEFAULT_HOP, test_size=0.2, sampling_rate=SAMPLING_RATE):
+    """
+    为每个窗口长度训练一个模型（需要 TensorFlow），保存到 output_dir 并写出 variants.json 清单
+    :param seconds: 窗口长度列表（秒）
+    :param variant: modelvariants.VARIANTS 中的模型结构
+    :return: 清单中的各行，附加 seconds / window_size 字段
+    """
+    import tensorflow as tf
+    from modelvariants import build_model, evaluate_variant, write_manifest
+
+    recordings = [split_recording(load_recording(base_dir, letter), test_size) for letter in letters]
+    rows = []
+    for length in seconds:
+        window_size = int(round(length * sampling_rate))
+        train = WindowedDataset(WindowedRecording(part, label, window_size, hop)
+                                for label, (part, _) in enumerate(recordings))
+        test = WindowedDataset(WindowedRecording(part, label, window_size, hop)
+                               for label, (_, part) in enumerate(recordings))
+        X_train, X_test = train.normalized(), test.normalized()
+        y_train = tf.keras.utils.to_categorical(train.labels, len(letters))
+        y_test = tf.keras.utils.to_categorical(test.labels, len(letters))
+
+        model = build_model(variant, input_shape=(window_size, NUM_CHANNELS), num_classes=len(letters))
+        model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+        model.fit(X_train, y_train, epochs=epochs, batch_size=32, validation_data=(X_test, y_test), verbose=2)
+
+        name = f"window_{int(round(length * 1000))}ms"
+        row = evaluate_variant(name, model, output_dir, X_test, test.labels)
+        row.update(description=f"{variant}，{length} 秒窗口", seconds=length, window_size=window_size)
+        print(f"{name}: 测试准确率 {row['accuracy']:.4f}")
+        rows.append(row)
+    write_manifest(rows, output_dir)
+    return rows
+
+
+def load_window_models(path, backend="numpy", instrumentation=None):
+    """
+    加载 train_window_models 训练的各窗口长度模型
+    :param path: 模型目录或其中的 variants.json
+    :return: EMGGestureClassifier 列表，按窗口长度从短到长排列
+    """
+    from modelvariants import load_manifest
+    classifiers = [EMGGestureClassifier(row["paths"][backend], backend=backend, fast_inference=backend == "keras",
+                                        instrumentation=instrumentation)
+                   for row in load_manifest(path)]
+    return sorted(classifiers, key=lambda c: c.window_size)
+
+
+class EarlyDecisionRecognizer:
+    """
+    多窗口长度的提前决策流式识别器，接口与 StreamingGestureRecognizer 相同（push / reset / samples_seen）
+
+    每隔 hop 个样本检查一次：在当前决策开始后已到达的数据中，按窗口从短到长依次识别，
+    第一个置信度不低于 threshold 的结果立即输出；最长窗口的模型可用时总是输出（回退）。
+    每次检查最多对每个窗口长度各推理一次，短窗口模型的计算量也相应更小。
+    """
+
+    def __init__(self, classifiers, hop=500, threshold=0.9, sampling_rate=SAMPLING_RATE, num_channels=NUM_CHANNELS,
+                 on_result=None, instrumentation=None, gate=None):
+        """
+        :param classifiers: 各窗口长度的 EMGGestureClassifier（window_size 互不相同）
+        :param hop: 两次检查之间的样本数，决定决策时间的分辨率
+        :param threshold: 提前输出所需的置信度，大于 1 时总是等到最长窗口
+        :param sampling_rate: 采样率（Hz），用于把决策时间换算为秒
+        :param num_channels: 通道数
+        :param on_result: 可选回调，每次输出结果时以结果字典调用
+        :param instrumentation: 可选的 Instrumentation，记录 end_to_end 延迟；默认沿用第一个 classifier 的实例
+        :param gate: 可选的 activitygate.ActivityGate：最近 hop 个样本内没有肌肉活动时不做决策，
+                     并把下一次决策的起点移到活动开始处，决策时间即从动作开始算起
+        """
+        if hop < 1:
+            raise ValueError(f"hop 需为正整数，当前值: {hop}")
+        self.classifiers = sorted(classifiers, key=lambda c: c.window_size)
+        self.window_sizes = [c.window_size for c in self.classifiers]
+        if len(set(self.window_sizes)) != len(self.window_sizes):
+            raise ValueError(f"各模型的窗口长度需互不相同，当前: {self.window_sizes}")
+        self.hop = hop
+        self.threshold = threshold
+        self.sampling_rate = sampling_rate
+        self.num_channels = num_channels
+        self.on_result = on_result
+        self.gate = gate
+        if instrumentation is None:
+            instrumentation = getattr(self.classifiers[0], "instrumentation", DISABLED)
+        self.instrumentation = instrumentation
+        self.reset()
+
+    def reset(self):
+        """清空缓冲区，重新开始决策"""
+        self._ring = MultiChannelRingBuffer(self.window_sizes[-1], self.num_channels, dtype=np.float32)
+        self._episode_start = 0  # 当前决策的起点（全局样本序号）
+        self._next_check = self.hop
+        self.decisions_by_window = {size: 0 for size in self.window_sizes}
+
+    @property
+    def samples_seen(self):
+        return self._ring.total_written
+
+    def push(self, chunk):
+        """
+        送入一段采集数据
+        :param chunk: 形状 (n, num_channels) 的数组
+        :return: 本次送入期间输出的结果列表。每个结果为 classifier.predict 的返回字典，并附加
+                 sample_index（决策时刻的全局样本序号）、window_size（做出决策的模型窗口长度）、
+                 decision_time（从决策起点到输出的秒数）和 early（是否因置信度达到阈值而提前输出）
+        """
+        arrival = time.perf_counter()
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim != 2 or chunk.shape[1] != self.num_channels:
+            raise ValueError(f"输入数据形状需为 (n, {self.num_channels})，当前形状: {chunk.shape}")
+        results = []
+        offset = 0
+        while offset < chunk.shape[0]:
+            n = min(chunk.shape[0] - offset, self._next_check - self._ring.total_written)
+            self._ring.append(chunk[offset:offset + n])
+            if self.gate is not None:
+                self.gate.update(chunk[offset:offset + n])
+            offset += n
+            if self._ring.total_written == self._next_check:
+                self._next_check += self.hop
+                result = self._check(arrival)
+                if result is not None:
+                    results.append(result)
+        return results
+
+    def _check(self, arrival):
+        end = self._ring.total_written
+        if self.gate is not None and not self.gate.check(self.hop):
+            self._episode_start = end  # 静息期间不做决策，下一次决策从活动开始处计时
+            return None
+        elapsed = end - self._episode_start
+        for classifier in self.classifiers:
+            if classifier.window_size > elapsed:
+                return None  # 更长的窗口还没有足够的数据
+            result = classifier.predict(classifier.preprocess(self._ring.latest(classifier.window_size)))
+            early = result["confidence"] >= self.threshold
+            if early or classifier is self.classifiers[-1]:
+                break
+        result.update(sample_index=end, window_size=classifier.window_size,
+                      decision_time=elapsed / self.sampling_rate, early=early)
+        self.decisions_by_window[classifier.window_size] += 1
+        self._episode_start = end
+        self.instrumentation.record("end_to_end", time.perf_counter() - arrival)
+        if self.on_result is not None:
+            self.on_result(result)
+        return result
+
+
+def _summarize(name, results, truths, sampling_rate):
+    if not results:
+        return {"mode": name, "decisions": 0}
+    times = np.array([r["decision_time"] for r in results])
+    correct = np.array([r["label"] == t for r, t in zip(results, truths)])
+    sizes = np.array([r["window_size"] for r in results])
+    p50, p90 = np.percentile(times, [50, 90])
+    return {
+        "mode": name,
+        "decisions": len(results),
+        "accuracy": float(correct.mean()),
+        "ttd_mean_s": float(times.mean()),
+        "ttd_p50_s": float(p50),
+        "ttd_p90_s": float(p90),
+        # 由各窗口长度（秒）的模型做出的决策比例及其准确率
+        "by_window": {f"{size / sampling_rate:g}": {"share": float(np.mean(sizes == size)),
+                                                    "accuracy": float(correct[sizes == size].mean())}
+                      for size in np.unique(sizes)},
+    }
+
+
+def decision_report(classifiers, recordings, thresholds=(0.6, 0.7, 0.8, 0.9, 0.95), hop=250,
+                    sampling_rate=SAMPLING_RATE):
+    """
+    在测试录音上统计决策时间与准确率
+    :param classifiers: 各窗口长度的 EMGGestureClassifier
+    :param recordings: (连续录音, 标签字符) 列表，每段录音只包含一种手势
+    :param thresholds: 要比较的置信度阈值
+    :return: 每种模式一行：各固定窗口长度（决策时间恒为窗口长度）及各阈值下的提前决策
+    """
+    def run(models, threshold):
+        recognizer = EarlyDecisionRecognizer(models, hop, threshold, sampling_rate)
+        results, truths = [], []
+        for data, label in recordings:
+            recognizer.reset()
+            decided = recognizer.push(data)
+            results += decided
+            truths += [label] * len(decided)
+        return results, truths
+
+    rows = []
+    for classifier in sorted(classifiers, key=lambda c: c.window_size):
+        name = f"固定 {classifier.window_size / sampling_rate:g}s"
+        rows.append(_summarize(name, *run([classifier], np.inf), sampling_rate))
+    for threshold in thresholds:
+        rows.append(_summarize(f"阈值 {threshold:g}", *run(classifiers, threshold), sampling_rate))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多窗口长度模型的训练与提前决策的决策时间-准确率报告")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="为每个窗口长度训练一个模型")
+    train_parser.add_argument("--data-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    train_parser.add_argument("--output-dir", default="window_models")
+    train_parser.add_argument("--seconds", type=float, nargs="+", default=list(WINDOW_SECONDS))
+    train_parser.add_argument("--variant", default="gap", help="modelvariants.py 中的模型结构")
+    train_parser.add_argument("--epochs", type=int, default=50)
+
+    report_parser = commands.add_parser("report", help="在各录音末尾的测试部分上统计决策时间与准确率")
+    report_parser.add_argument("models", nargs="?", default="window_models", help="模型目录或 variants.json")
+    report_parser.add_argument("--data-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    report_parser.add_argument("--backend", default="numpy", choices=["keras", "numpy"])
+    report_parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9, 0.95])
+    report_parser.add_argument("--hop", type=int, default=250, help="检查间隔（样本数），决定决策时间的分辨率")
+    report_parser.add_argument("--test-size", type=float, default=0.2, help="需与训练时一致")
+    report_parser.add_argument("--json", help="可选，将报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    if args.command == "train":
+        train_window_models(args.data_dir, args.output_dir, seconds=args.seconds, variant=args.variant,
+                            epochs=args.epochs)
+    else:
+        classifiers = load_window_models(args.models, args.backend)
+        recordings = [(split_recording(load_recording(args.data_dir, letter), args.test_size)[1], letter)
+                      for letter in classifiers[0].label_map.values()]
+        report = decision_report(classifiers, recordings, args.thresholds, args.hop)
+        print(f"{'模式':<12}{'决策数':>8}{'准确率':>8}{'平均(s)':>10}{'p50(s)':>10}{'p90(s)':>10}  各窗口占比")
+        for row in report:
+            if not row["decisions"]:
+                print(f"{row['mode']:<12}{0:>8}")
+                continue
+            shares = " ".join(f"{size}s:{v['share']:.0%}" for size, v in row["by_window"].items())
+            print(f"{row['mode']:<12}{row['decisions']:>8}{row['accuracy']:>8.4f}{row['ttd_mean_s']:>10.3f}"
+                  f"{row['ttd_p50_s']:>10.3f}{row['ttd_p90_s']:>10.3f}  {shares}")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,279 @@
+import os
+import json
+import time
+import socket
+import struct
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from EMGGestureClassifier import EMGGestureClassifier, NUM_CHANNELS
+from instrumentation import DISABLED
+
+# 本地推理服务：模型只加载一次，多个采集站通过 TCP / Unix socket 发送预处理后的窗口，
+# 服务端把同时到达的请求在延迟预算内合并成一个批次推理，再把各自的结果分别返回。
+# InferenceClient 与 EMGGestureClassifier 接口相同（preprocess / predict / predict_batch ...），可直接替换。
+#
+# 通信协议（每条消息）：
+#   头部长度(<I) 数据长度(<I) JSON 头部 float32 小端数据
+#   请求  {"op": "predict", "shape": [n, 3000, 4]} + 窗口数据；{"op": "info"}；{"op": "stats"}
+#   响应  {"shape": [n, 类别数]} + 概率矩阵；{"labels": [...], ...}；出错时 {"error": "..."}
+
+DEFAULT_ADDRESS = "tcp://127.0.0.1:8765"
+_PREFIX = struct.Struct("<II")
+
+
+def _parse_address(address):
+    """tcp://host:port 或 unix:///path/to.sock"""
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://"):]
+    if address.startswith("tcp://"):
+        host, port = address[len("tcp://"):].rsplit(":", 1)
+        return "tcp", (host, int(port))
+    raise ValueError(f"不支持的地址: {address}，应为 tcp://host:port 或 unix:///path")
+
+
+def _encode(header, payload=b""):
+    header = json.dumps(header).encode()
+    return _PREFIX.pack(len(header), len(payload)) + header + payload
+
+
+class MicroBatcher:
+    """
+    动态微批：第一个请求到达后最多再等待 max_wait_ms 收集其他请求，
+    凑满 max_batch 个窗口或等待超时即合并推理。模型在单独的线程中执行，推理期间到达的请求进入下一批。
+    """
+
+    def __init__(self, predict_fn, max_batch=64, max_wait_ms=5.0):
+        """
+        :param predict_fn: 形状 (n, 3000, 4) -> (n, 类别数) 概率矩阵的函数
+        :param max_batch: 每批最多的窗口数
+        :param max_wait_ms: 延迟预算：批次中第一个请求最多为凑批等待的时间（毫秒）
+        """
+        self.predict_fn = predict_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.requests = 0
+        self.windows = 0
+        self.batches = 0
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def submit(self, windows):
+        """提交一组窗口，等待其概率矩阵"""
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((windows, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            count = items[0][0].shape[0]
+            deadline = loop.time() + self.max_wait
+            while count < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                items.append(item)
+                count += item[0].shape[0]
+
+            batch = np.concatenate([windows for windows, _ in items])
+            try:
+                probabilities = await loop.run_in_executor(self._executor, self.predict_fn, batch)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.requests += len(items)
+            self.windows += batch.shape[0]
+            self.batches += 1
+            offset = 0
+            for windows, future in items:
+                n = windows.shape[0]
+                if not future.done():  # 客户端可能已断开
+                    future.set_result(probabilities[offset:offset + n])
+                offset += n
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "windows": self.windows,
+            "batches": self.batches,
+            "mean_batch_size": self.windows / self.batches if self.batches else 0.0,
+        }
+
+
+class InferenceServer:
+    """加载一次模型，为多个客户端提供微批推理"""
+
+    def __init__(self, classifier, address=DEFAULT_ADDRESS, max_batch=64, max_wait_ms=5.0):
+        """
+        :param classifier: EMGGestureClassifier 实例（任意后端）
+        :param address: 监听地址，tcp://host:port 或 unix:///path
+        """
+        self.classifier = classifier
+        self.address = address
+        self.batcher = MicroBatcher(
+            lambda batch: np.asarray(classifier._predict_proba(batch), dtype=np.float32), max_batch, max_wait_ms)
+
+    async def serve(self, ready=None):
+        """
+        启动服务并一直运行
+        :param ready: 可选的 threading.Event，开始监听后置位
+        """
+        kind, target = _parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            server = await asyncio.start_unix_server(self._handle, path=target)
+        else:
+            server = await asyncio.start_server(self._handle, host=target[0], port=target[1])
+        batcher = asyncio.create_task(self.batcher.run())
+        print(f"推理服务已启动: {self.address}（每批最多 {self.batcher.max_batch} 个窗口，"
+              f"延迟预算 {self.batcher.max_wait * 1000:.1f} ms）", flush=True)
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    prefix = await reader.readexactly(_PREFIX.size)
+                except asyncio.IncompleteReadError:
+                    break
+                header_len, payload_len = _PREFIX.unpack(prefix)
+                header = json.loads(await reader.readexactly(header_len))
+                payload = await reader.readexactly(payload_len)
+                writer.write(await self._dispatch(header, payload))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, header, payload):
+        op = header.get("op")
+        if op == "info":
+            return _encode({"labels": list(self.classifier.label_map.values()),
+                            "window_size": self.classifier.window_size, "num_channels": NUM_CHANNELS})
+        if op == "stats":
+            return _encode(self.batcher.stats())
+        if op != "predict":
+            return _encode({"error": f"不支持的操作: {op}"})
+        shape = tuple(header.get("shape", ()))
+        window_size = self.classifier.window_size
+        if len(shape) != 3 or shape[1:] != (window_size, NUM_CHANNELS) or len(payload) != 4 * int(np.prod(shape)):
+            return _encode({"error": f"输入数据形状需为 (N, {window_size}, {NUM_CHANNELS})，当前形状: {shape}"})
+        windows = np.frombuffer(payload, dtype="<f4").reshape(shape)
+        try:
+            probabilities = await self.batcher.submit(windows)
+        except Exception as e:
+            return _encode({"error": f"{type(e).__name__}: {e}"})
+        probabilities = np.ascontiguousarray(probabilities, dtype="<f4")
+        return _encode({"shape": list(probabilities.shape)}, probabilities.tobytes())
+
+
+class InferenceClient(EMGGestureClassifier):
+    """
+    推理服务的客户端，接口与 EMGGestureClassifier 相同（preprocess、predict、predict_batch、
+    latency_report、predict_from_csv 等），本地只做预处理，不加载 TensorFlow 和模型。
+    同一实例可被多个线程共用（请求串行发送）。
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=10.0, instrumentation=None):
+        """
+        :param address: 服务地址，tcp://host:port 或 unix:///path
+        :param timeout: 单次请求超时（秒）；请求超时或出错后连接关闭，之后的调用抛出 ConnectionError，需重新创建客户端
+        """
+        self.address = address
+        self.backend = "remote"
+        self.instrumentation = instrumentation if instrumentation is not None else DISABLED
+        self._infer_fn = None
+        self._lock = threading.Lock()
+        self._broken = None  # 请求中途失败的异常，非 None 时连接已关闭
+        kind, target = _parse_address(address)
+        family = socket.AF_UNIX if kind == "unix" else socket.AF_INET
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(target)
+        if family == socket.AF_INET:
+            self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        info, _ = self._request({"op": "info"})
+        self.label_map = dict(enumerate(info["labels"]))
+        self.window_size = info["window_size"]
+
+    def _recv_exactly(self, n):
+        buf = bytearray(n)
+        view = memoryview(buf)
+        pos = 0
+        while pos < n:
+            received = self._sock.recv_into(view[pos:], n - pos)
+            if not received:
+                raise ConnectionError("推理服务已断开连接")
+            pos += received
+        return bytes(buf)
+
+    def _request(self, header, payload=b""):
+        with self._lock:
+            if self._broken is not None:
+                raise ConnectionError(f"与推理服务的连接已失效: {self._broken!r}")
+            try:
+                self._sock.sendall(_encode(header, payload))
+                header_len, payload_len = _PREFIX.unpack(self._recv_exactly(_PREFIX.size))
+                response = json.loads(self._recv_exactly(header_len))
+                data = self._recv_exactly(payload_len) if payload_len else b""
+            except Exception as e:
+                # 请求中途超时或出错时，服务端迟到的回复会留在连接上，被下一个请求误读；
+                # 关闭连接，之后的调用直接报错
+                self._broken = e
+                self._sock.close()
+                raise
+        if "error" in response:
+            raise ValueError(response["error"])
+        return response, data
+
+    def _predict_proba(self, batch):
+        batch = np.ascontiguousarray(batch, dtype="<f4")
+        response, data = self._request({"op": "predict", "shape": list(batch.shape)}, batch.tobytes())
+        return np.frombuffer(data, dtype="<f4").reshape(response["shape"])
+
+    def _predict_single(self, data):
+        return self._predict_proba(data)[0]
+
+    def server_stats(self):
+        """服务端的批处理统计：requests / windows / batches / mean_batch_size"""
+        return self._request({"op": "stats"})[0]
+
+    def close(self):
+        self._sock.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EMG 手势识别推理服务（多客户端动态微批）")
+    parser.add_argument("--model", default="emg_gesture_model")
+    parser.add_argument("--backend", default="keras", choices=["keras", "numpy", "tflite"])
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="tcp://host:port 或 unix:///path")
+    parser.add_argument("--max-batch", type=int, default=64, help="每批最多的窗口数")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="凑批的延迟预算（毫秒）")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    server = InferenceServer(EMGGestureClassifier(args.model, backend=args.backend), args.address,
+                             args.max_batch, args.max_wait_ms)
+    print(f"模型加载耗时 {time.perf_counter() - start:.2f} 秒")
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
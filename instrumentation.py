@@ -0,0 +1,141 @@
+import math
+import time
+import threading
+from contextlib import nullcontext
+import numpy as np
+
+# 识别流程的分阶段延迟统计
+# 每个阶段的耗时记入固定大小的对数分桶直方图，内存占用恒定；关闭时 stage() 返回共享的空上下文，几乎没有开销
+#
+# 约定的阶段名：
+#   daq_read      AcquisitionThread.run 中一次 task.read 的阻塞时间
+#   preprocess    EMGGestureClassifier.preprocess 的标准化
+#   model         模型前向计算
+#   postprocess   概率转换为结果字典
+#   end_to_end    包含窗口最后一个样本的数据块到达识别器，到输出识别结果的时间
+
+_NULL_STAGE = nullcontext()
+
+
+class LatencyHistogram:
+    """对数分桶的延迟直方图，覆盖 1 微秒 ~ 100 秒，每个数量级 20 个桶（相对误差约 12%）"""
+
+    MIN_SECONDS = 1e-6
+    DECADES = 8
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self):
+        n = self.DECADES * self.BUCKETS_PER_DECADE
+        self.counts = np.zeros(n + 2, dtype=np.int64)  # 首尾两个桶分别收集下溢和上溢
+        # 第 i 个常规桶的上边界
+        self._upper = self.MIN_SECONDS * 10 ** (np.arange(1, n + 1) / self.BUCKETS_PER_DECADE)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        seconds = float(seconds)
+        if seconds < self.MIN_SECONDS:
+            index = 0
+        else:
+            index = 1 + int(math.log10(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_DECADE)
+            index = min(index, len(self.counts) - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """
+        :param q: 百分位（0-100）
+        :return: 该百分位所在桶的上边界（秒），无数据时返回 0
+        """
+        if self.count == 0:
+            return 0.0
+        rank = math.ceil(q / 100 * self.count)
+        index = int(np.searchsorted(np.cumsum(self.counts), max(rank, 1)))
+        if index == 0:
+            return self.MIN_SECONDS
+        if index == len(self.counts) - 1:
+            return self.max
+        return float(min(self._upper[index - 1], self.max))
+
+    def summary(self):
+        """统计摘要（毫秒）"""
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile(50) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+        }
+
+
+class _Stage:
+    """计时上下文：退出时把耗时记入对应阶段"""
+
+    __slots__ = ("_owner", "_name", "_start")
+
+    def __init__(self, owner, name):
+        self._owner = owner
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._owner.record(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class Instrumentation:
+    """
+    分阶段延迟统计
+    用法：
+        with instrumentation.stage("preprocess"):
+            ...
+        instrumentation.snapshot()  # {"preprocess": {"count", "p50_ms", "p99_ms", "mean_ms", "max_ms"}, ...}
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._histograms = {}
+        self._callbacks = []
+        self._lock = threading.Lock()  # 采集线程与 GUI 线程可能同时记录/读取
+
+    def stage(self, name):
+        """返回一个计时上下文；关闭时返回共享的空上下文"""
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, seconds):
+        """直接记录一次耗时（秒）"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(seconds)
+        for callback in self._callbacks:
+            callback(name, seconds)
+
+    def add_callback(self, callback):
+        """注册回调，每次记录时以 (阶段名, 秒) 调用；回调在记录所在线程中执行，应尽量轻量"""
+        self._callbacks.append(callback)
+
+    def snapshot(self):
+        """各阶段的统计摘要（毫秒）"""
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in self._histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# 未指定时使用的默认实例（关闭状态）
+DISABLED = Instrumentation(enabled=False)
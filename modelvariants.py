@@ -0,0 +1,187 @@
+import os
+import json
+import argparse
+import numpy as np
+from EMGGestureClassifier import EMGGestureClassifier, WINDOW_SIZE, NUM_CHANNELS
+
+# 紧凑模型族：基线模型 Flatten 之后约 4.7 万维特征接 Dense(128)，这一层约 600 万参数，
+# 占了模型大小、加载时间和单窗口计算量的绝大部分。这里的变体用全局平均池化（GAP）头部代替 Flatten，
+# 并用步长卷积 / 深度可分离卷积 / 更少的卷积核压缩卷积部分，所有变体都只用 numpyengine 支持的层。
+#
+# cnnrun.py 依次训练这些变体，保存 SavedModel 和 .npz，并写出清单 variants.json
+# （准确率、参数量、文件大小、CPU 单窗口延迟）；EMGGestureClassifier.from_variants 按延迟预算从清单中选模型。
+
+MANIFEST_NAME = "variants.json"
+
+VARIANTS = {
+    "baseline": "Conv32-Conv64 + Flatten -> Dense128（原模型）",
+    "gap": "Conv32-Conv64 + GAP -> Dense64",
+    "strided": "步长卷积 Conv32/2-Conv64/2-Conv64/2 + GAP -> Dense64",
+    "separable": "Conv32 + 深度可分离 SepConv64-SepConv64/2 + GAP -> Dense64",
+    "small": "Conv16/2 + SepConv32 + GAP -> Dense32",
+}
+
+
+def build_model(variant, input_shape=(WINDOW_SIZE, NUM_CHANNELS), num_classes=4):
+    """
+    构建指定变体的 Keras 模型（未编译，需要 TensorFlow）
+    :param variant: VARIANTS 中的名称
+    :return: tf.keras.Sequential
+    """
+    from tensorflow.keras.models import Sequential
+    from tensorflow.keras.layers import (Input, Conv1D, SeparableConv1D, MaxPooling1D, Flatten,
+                                         GlobalAveragePooling1D, Dense, Dropout, BatchNormalization)
+    if variant == "baseline":
+        layers = [
+            Conv1D(32, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            Conv1D(64, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            Flatten(), Dense(128, activation='relu'), Dropout(0.5),
+        ]
+    elif variant == "gap":
+        layers = [
+            Conv1D(32, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            Conv1D(64, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            GlobalAveragePooling1D(), Dense(64, activation='relu'), Dropout(0.5),
+        ]
+    elif variant == "strided":
+        layers = [
+            Conv1D(32, 7, strides=2, activation='relu'), BatchNormalization(),
+            Conv1D(64, 5, strides=2, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            Conv1D(64, 5, strides=2, activation='relu'), BatchNormalization(),
+            GlobalAveragePooling1D(), Dense(64, activation='relu'), Dropout(0.5),
+        ]
+    elif variant == "separable":
+        layers = [
+            Conv1D(32, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            SeparableConv1D(64, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            SeparableConv1D(64, 5, strides=2, activation='relu'), BatchNormalization(),
+            GlobalAveragePooling1D(), Dense(64, activation='relu'), Dropout(0.5),
+        ]
+    elif variant == "small":
+        layers = [
+            Conv1D(16, 5, strides=2, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            SeparableConv1D(32, 5, activation='relu'), BatchNormalization(), MaxPooling1D(2),
+            GlobalAveragePooling1D(), Dense(32, activation='relu'), Dropout(0.3),
+        ]
+    else:
+        raise ValueError(f"未知的模型变体: {variant}，可选: {list(VARIANTS)}")
+    return Sequential([Input(shape=input_shape)] + layers + [Dense(num_classes, activation='softmax')])
+
+
+def evaluate_variant(name, model, output_dir, X_test, y_test, n_calls=200):
+    """
+    保存并评估一个训练好的变体
+    :param model: 训练好的 tf.keras 模型
+    :param output_dir: 输出目录，SavedModel 保存为 {name}/，NumPy 权重为 {name}.npz
+    :param X_test: 标准化后的测试窗口，形状 (N, 3000, 4)
+    :param y_test: 测试标签（类别编号）
+    :return: 清单中的一行：准确率、参数量、文件大小、各后端 CPU 单窗口延迟（preprocess + predict）
+    """
+    from numpyengine import export_npz
+    from quantize import _path_size
+
+    os.makedirs(output_dir, exist_ok=True)
+    saved_path = os.path.join(output_dir, name)
+    npz_path = os.path.join(output_dir, f"{name}.npz")
+    model.save(saved_path)
+    export_npz(model, npz_path)
+
+    row = {
+        "name": name,
+        "description": VARIANTS.get(name, ""),
+        "params": int(model.count_params()),
+        "paths": {"keras": name, "numpy": f"{name}.npz"},  # 相对清单所在目录
+        "size_mb": {"keras": _path_size(saved_path) / 1e6, "numpy": os.path.getsize(npz_path) / 1e6},
+        "latency_ms": {},
+    }
+    for backend in ("keras", "numpy"):
+        classifier = EMGGestureClassifier(os.path.join(output_dir, row["paths"][backend]), backend=backend,
+                                          fast_inference=backend == "keras")
+        if backend == "numpy":
+            # 用部署时实际运行的 NumPy 引擎计算准确率，同时校验导出结果
+            pred = classifier.predict_batch(X_test)["label_indices"]
+            row["accuracy"] = float(np.mean(pred == np.asarray(y_test)))
+        report = classifier.latency_report(n_calls=n_calls, raw_data=X_test[0])
+        row["latency_ms"][backend] = {"p50": report["p50_ms"], "p99": report["p99_ms"]}
+    return row
+
+
+def write_manifest(rows, output_dir):
+    """把各变体的结果写入 {output_dir}/variants.json"""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"variants": rows}, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def load_manifest(path):
+    """
+    读取清单
+    :param path: variants.json 或其所在目录
+    :return: 变体列表，paths 已解析为绝对路径
+    """
+    if os.path.isdir(path):
+        path = os.path.join(path, MANIFEST_NAME)
+    with open(path, encoding="utf-8") as f:
+        rows = json.load(f)["variants"]
+    base = os.path.dirname(os.path.abspath(path))
+    for row in rows:
+        row["paths"] = {backend: os.path.join(base, p) for backend, p in row["paths"].items()}
+    return rows
+
+
+def select_variant(rows, latency_budget_ms, backend="numpy", percentile="p99", remeasure=False, n_calls=100):
+    """
+    在延迟预算内选择准确率最高的变体（准确率相同时取更快的）
+    :param rows: load_manifest 返回的变体列表
+    :param latency_budget_ms: 单窗口延迟预算（毫秒）
+    :param backend: 部署使用的推理后端（"keras" 或 "numpy"）
+    :param percentile: 与预算比较的延迟分位数，"p50" 或 "p99"
+    :param remeasure: 为 True 时在本机重新测量各变体的延迟（清单中的延迟是在训练机器上测得的）
+    :return: 选中的变体（清单中的一行）
+    """
+    candidates = []
+    for row in rows:
+        if backend not in row["paths"]:
+            continue
+        latency = row["latency_ms"][backend][percentile]
+        if remeasure:
+            classifier = EMGGestureClassifier(row["paths"][backend], backend=backend,
+                                              fast_inference=backend == "keras")
+            latency = classifier.latency_report(n_calls=n_calls)[f"{percentile}_ms"]
+            row["latency_ms"][backend][percentile] = latency
+        candidates.append((row, latency))
+    if not candidates:
+        raise ValueError(f"清单中没有 {backend} 后端的模型")
+    fitting = [(row, latency) for row, latency in candidates if latency <= latency_budget_ms]
+    if not fitting:
+        fastest, latency = min(candidates, key=lambda item: item[1])
+        raise ValueError(f"没有满足 {latency_budget_ms} ms 延迟预算的模型，"
+                         f"最快的是 {fastest['name']}（{percentile} {latency:.2f} ms）")
+    return max(fitting, key=lambda item: (item[0]["accuracy"], -item[1]))[0]
+
+
+def print_table(rows, backend="numpy"):
+    print(f"{'变体':<12}{'准确率':>8}{'参数量':>12}{'大小(MB)':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for row in rows:
+        latency = row["latency_ms"][backend]
+        print(f"{row['name']:<12}{row['accuracy']:>8.4f}{row['params']:>12,}{row['size_mb'][backend]:>10.2f}"
+              f"{latency['p50']:>10.3f}{latency['p99']:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="查看 cnnrun.py 训练的模型变体对比表，并按延迟预算选择模型")
+    parser.add_argument("manifest", nargs="?", default="model_variants", help="variants.json 或其所在目录")
+    parser.add_argument("--backend", default="numpy", choices=["keras", "numpy"])
+    parser.add_argument("--budget", type=float, help="单窗口延迟预算（毫秒）")
+    parser.add_argument("--percentile", default="p99", choices=["p50", "p99"])
+    parser.add_argument("--remeasure", action="store_true", help="在本机重新测量延迟")
+    args = parser.parse_args()
+
+    rows = load_manifest(args.manifest)
+    if args.budget is not None:
+        chosen = select_variant(rows, args.budget, args.backend, args.percentile, args.remeasure)
+    print_table(rows, args.backend)
+    if args.budget is not None:
+        print(f"延迟预算 {args.budget} ms（{args.percentile}）内准确率最高的变体: {chosen['name']} "
+              f"({chosen['paths'][args.backend]})")
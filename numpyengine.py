@@ -0,0 +1,341 @@
+import os
+import json
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 纯 NumPy 推理引擎：导出器把 SavedModel 权重写成 .npz，运行时只依赖 NumPy，不导入 TensorFlow
+#
+# BatchNorm 折叠规则（推理时 BN 是逐通道仿射 y = a * x + c）：
+#   - 前一层是无激活的 Conv1D/Dense 时，直接折叠进该层：W' = W * a, b' = a * b + c
+#   - 否则（如本模型的 Conv1D(relu) -> BN）向后折叠进下一个线性层：W' = W * a, b' = b + c @ W。
+#     中间若隔着 MaxPooling1D，利用 max(a * x + c) = |a| * max(sign(a) * x) + c，
+#     池化前对 a < 0 的通道取反，之后继续用 |a| 向后折叠，结果与原网络完全等价
+#   - GlobalAveragePooling1D 是线性的，待折叠的仿射原样穿过它
+#   - SeparableConv1D 拆成逐通道卷积（depthwise）和 1x1 卷积两个算子，前面的仿射折叠进逐通道卷积
+#   - Dropout 在推理时为恒等映射，直接丢弃
+
+FORMAT_VERSION = 1
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=-1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=-1, keepdims=True)
+    return x
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "softmax": _softmax,
+}
+
+
+def conv1d(x, w, b, stride=1):
+    """
+    valid 填充的一维卷积（im2col + 矩阵乘）
+    :param x: 输入，形状 (N, T, C_in)
+    :param w: 卷积核，形状 (k, C_in, C_out)（与 Keras 布局一致）
+    :param b: 偏置，形状 (C_out,)
+    :return: 形状 (N, (T - k) // stride + 1, C_out)
+    """
+    k, c_in, c_out = w.shape
+    windows = sliding_window_view(x, k, axis=1)[:, ::stride]  # (N, T', C_in, k)
+    n, t_out = windows.shape[:2]
+    cols = windows.reshape(n, t_out, c_in * k)
+    kernel = w.transpose(1, 0, 2).reshape(c_in * k, c_out)
+    return cols @ kernel + b
+
+
+def depthwise_conv1d(x, w, b, stride=1):
+    """
+    valid 填充的逐通道一维卷积（SeparableConv1D 的第一步）
+    :param x: 输入，形状 (N, T, C)
+    :param w: 卷积核，形状 (k, C, m)，m 为 depth_multiplier（与 Keras 布局一致）
+    :param b: 偏置，形状 (C * m,)
+    :return: 形状 (N, (T - k) // stride + 1, C * m)，输出通道按 (C, m) 顺序排列
+    """
+    windows = sliding_window_view(x, w.shape[0], axis=1)[:, ::stride]  # (N, T', C, k)
+    out = np.einsum("ntck,kcm->ntcm", windows, w)
+    return out.reshape(out.shape[0], out.shape[1], -1) + b
+
+
+def maxpool1d(x, size, stride):
+    """valid 填充的一维最大池化，输入形状 (N, T, C)"""
+    t_out = (x.shape[1] - size) // stride + 1
+    if size == stride:
+        n, _, c = x.shape
+        return x[:, :t_out * size].reshape(n, t_out, size, c).max(axis=2)
+    return sliding_window_view(x, size, axis=1)[:, ::stride][:, :t_out].max(axis=-1)
+
+
+class _Folder:
+    """把 Keras 层序列转换为 NumPy 算子序列，并完成 BatchNorm 折叠"""
+
+    def __init__(self, input_shape):
+        self.shape = tuple(input_shape)  # 当前张量形状（不含 batch 维）
+        self.ops = []
+        self.arrays = {}
+        self.pending = None  # 尚未折叠的逐通道仿射 (scale, shift)
+
+    def _add(self, op, **arrays):
+        index = len(self.ops)
+        self.ops.append(op)
+        for name, value in arrays.items():
+            self.arrays[f"{index}/{name}"] = np.asarray(value, dtype=np.float32)
+
+    def _flush(self):
+        """无法继续向后折叠时，把待处理的仿射显式写成一个算子"""
+        if self.pending is not None:
+            scale, shift = self.pending
+            self._add({"type": "affine"}, scale=scale, shift=shift)
+            self.pending = None
+
+    def _fold_forward(self, w, b, depthwise=False):
+        """把待处理的仿射折叠进下一线性层的输入侧"""
+        if self.pending is None:
+            return w, b
+        scale, shift = self.pending
+        self.pending = None
+        if w.ndim == 3:  # Conv1D: (k, C_in, C_out)；逐通道卷积 (k, C, m) 的布局相同，但每个输入通道只连到自己的 m 个输出
+            if depthwise:
+                return w * scale[None, :, None], b + np.einsum("kcm,c->cm", w, shift).reshape(-1)
+            return w * scale[None, :, None], b + np.einsum("kio,i->o", w, shift)
+        return w * scale[:, None], b + shift @ w
+
+    def conv1d(self, w, b, stride, padding, activation):
+        if padding != "valid":
+            raise ValueError(f"仅支持 valid 填充的 Conv1D，当前: {padding}")
+        w, b = self._fold_forward(np.asarray(w, np.float64), np.asarray(b, np.float64))
+        self._add({"type": "conv1d", "stride": stride, "activation": activation}, w=w, b=b)
+        self.shape = ((self.shape[0] - w.shape[0]) // stride + 1, w.shape[2])
+
+    def separable_conv1d(self, depthwise, pointwise, b, stride, padding, activation):
+        if padding != "valid":
+            raise ValueError(f"仅支持 valid 填充的 SeparableConv1D，当前: {padding}")
+        depthwise = np.asarray(depthwise, np.float64)
+        dw_b = np.zeros(depthwise.shape[1] * depthwise.shape[2])
+        depthwise, dw_b = self._fold_forward(depthwise, dw_b, depthwise=True)
+        self._add({"type": "depthwise_conv1d", "stride": stride}, w=depthwise, b=dw_b)
+        self.shape = ((self.shape[0] - depthwise.shape[0]) // stride + 1, dw_b.shape[0])
+        self.conv1d(pointwise, b, 1, "valid", activation)
+
+    def dense(self, w, b, activation):
+        if len(self.shape) != 1:
+            raise ValueError(f"Dense 层需接在 Flatten 之后，当前输入形状: {self.shape}")
+        w, b = self._fold_forward(np.asarray(w, np.float64), np.asarray(b, np.float64))
+        self._add({"type": "dense", "activation": activation}, w=w, b=b)
+        self.shape = (w.shape[1],)
+
+    def batchnorm(self, gamma, beta, mean, var, epsilon):
+        scale = np.asarray(gamma, np.float64) / np.sqrt(np.asarray(var, np.float64) + epsilon)
+        shift = np.asarray(beta, np.float64) - scale * np.asarray(mean, np.float64)
+        last = self.ops[-1] if self.ops else None
+        if self.pending is None and last is not None and last["type"] in ("conv1d", "dense") \
+                and last["activation"] == "linear":
+            # 向前折叠进无激活的线性层
+            index = len(self.ops) - 1
+            w, b = self.arrays[f"{index}/w"], self.arrays[f"{index}/b"]
+            self.arrays[f"{index}/w"] = (w * scale).astype(np.float32)
+            self.arrays[f"{index}/b"] = (b * scale + shift).astype(np.float32)
+        elif self.pending is None:
+            self.pending = (scale, shift)
+        else:
+            prev_scale, prev_shift = self.pending
+            self.pending = (prev_scale * scale, prev_shift * scale + shift)
+
+    def maxpool(self, size, stride, padding):
+        if padding != "valid":
+            raise ValueError(f"仅支持 valid 填充的 MaxPooling1D，当前: {padding}")
+        op = {"type": "maxpool", "size": size, "stride": stride}
+        if self.pending is not None:
+            scale, shift = self.pending
+            self._add(op, sign=np.where(scale < 0, -1.0, 1.0))
+            self.pending = (np.abs(scale), shift)
+        else:
+            self._add(op)
+        self.shape = ((self.shape[0] - size) // stride + 1, self.shape[1])
+
+    def flatten(self):
+        self._add({"type": "flatten"})
+        if self.pending is not None:
+            # 展平后特征顺序为 (时间, 通道)，逐通道仿射需按时间长度平铺
+            scale, shift = self.pending
+            self.pending = (np.tile(scale, self.shape[0]), np.tile(shift, self.shape[0]))
+        self.shape = (self.shape[0] * self.shape[1],)
+
+    def global_average_pool(self):
+        self._add({"type": "gap"})
+        self.shape = (self.shape[1],)
+
+    def activation(self, activation):
+        self._flush()
+        self._add({"type": "activation", "activation": activation})
+
+    def finish(self):
+        self._flush()
+        return self.ops, self.arrays
+
+
+def fold_keras_model(model):
+    """
+    把 Keras 模型转换为 NumPy 算子序列
+    :param model: 已加载的 tf.keras 模型（Sequential 结构）
+    :return: (ops, arrays)，ops 为算子描述列表，arrays 为 "序号/名称" -> 权重 的字典
+    """
+    folder = _Folder(model.input_shape[1:])
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind == "Conv1D":
+            w, b = layer.get_weights() if layer.use_bias else (layer.get_weights()[0], None)
+            if b is None:
+                b = np.zeros(w.shape[2])
+            folder.conv1d(w, b, layer.strides[0], layer.padding, layer.activation.__name__)
+        elif kind == "SeparableConv1D":
+            weights = layer.get_weights()
+            b = weights[2] if layer.use_bias else np.zeros(weights[1].shape[2])
+            folder.separable_conv1d(weights[0], weights[1], b, layer.strides[0], layer.padding,
+                                    layer.activation.__name__)
+        elif kind == "Dense":
+            w, b = layer.get_weights() if layer.use_bias else (layer.get_weights()[0], None)
+            if b is None:
+                b = np.zeros(w.shape[1])
+            folder.dense(w, b, layer.activation.__name__)
+        elif kind == "BatchNormalization":
+            weights = list(layer.get_weights())
+            channels = weights[-1].shape[0]
+            gamma = weights.pop(0) if layer.scale else np.ones(channels)
+            beta = weights.pop(0) if layer.center else np.zeros(channels)
+            mean, var = weights
+            folder.batchnorm(gamma, beta, mean, var, layer.epsilon)
+        elif kind == "MaxPooling1D":
+            folder.maxpool(layer.pool_size[0], layer.strides[0], layer.padding)
+        elif kind == "Flatten":
+            folder.flatten()
+        elif kind == "GlobalAveragePooling1D":
+            folder.global_average_pool()
+        elif kind == "Activation":
+            folder.activation(layer.activation.__name__)
+        elif kind in ("Dropout", "InputLayer"):
+            continue  # 推理时为恒等映射
+        else:
+            raise ValueError(f"NumPy 引擎不支持的层类型: {kind}")
+    return folder.finish()
+
+
+def export_npz(model, npz_path, labels=('i', 'b', 'h', 'e')):
+    """
+    导出模型权重为 NumPy 引擎使用的 .npz 文件（需要 TensorFlow）
+    :param model: tf.keras 模型或 SavedModel/.h5 路径
+    :param npz_path: 输出 .npz 路径
+    :param labels: 类别顺序（与训练时 letters 顺序一致）
+    """
+    if isinstance(model, (str, os.PathLike)):
+        import tensorflow as tf
+        model = tf.keras.models.load_model(model)
+    ops, arrays = fold_keras_model(model)
+    meta = {
+        "version": FORMAT_VERSION,
+        "input_shape": list(model.input_shape[1:]),
+        "labels": list(labels),
+        "ops": ops,
+    }
+    np.savez(npz_path, __meta__=np.array(json.dumps(meta)), **arrays)
+
+
+class NumpyGestureModel:
+    """
+    只依赖 NumPy 的推理运行时，读取 export_npz 导出的权重
+    提供与 Keras 模型相同的 predict / predict_on_batch 接口，可直接替换 EMGGestureClassifier.model
+    """
+
+    def __init__(self, npz_path, dtype=np.float32):
+        """
+        :param npz_path: export_npz 导出的 .npz 文件
+        :param dtype: 计算精度
+        """
+        with np.load(npz_path) as f:
+            meta = json.loads(str(f["__meta__"]))
+            if meta["version"] != FORMAT_VERSION:
+                raise ValueError(f"不支持的权重文件版本: {meta['version']}")
+            self.arrays = {k: f[k].astype(dtype) for k in f.files if k != "__meta__"}
+        self.dtype = dtype
+        self.ops = meta["ops"]
+        self.input_shape = tuple(meta["input_shape"])
+        self.labels = meta["labels"]
+
+    def _param(self, index, name):
+        return self.arrays.get(f"{index}/{name}")
+
+    def predict_on_batch(self, x):
+        """
+        对一个批次执行前向计算
+        :param x: 形状 (N, 3000, 4) 的标准化数据
+        :return: 形状 (N, 类别数) 的概率矩阵
+        """
+        x = np.asarray(x, dtype=self.dtype)
+        if x.shape[1:] != self.input_shape:
+            raise ValueError(f"输入数据形状需为 (N, {', '.join(map(str, self.input_shape))})，当前形状: {x.shape}")
+        return self.forward(x)
+
+    def forward(self, x, start=0, stop=None):
+        """
+        依次执行第 start 到 stop（不含）个算子，不检查输入形状
+        供流式引擎分段执行：卷积部分可以作用于任意长度的输入片段
+        """
+        for index in range(start, len(self.ops) if stop is None else stop):
+            op = self.ops[index]
+            kind = op["type"]
+            if kind == "conv1d":
+                x = ACTIVATIONS[op["activation"]](
+                    conv1d(x, self._param(index, "w"), self._param(index, "b"), op["stride"]))
+            elif kind == "depthwise_conv1d":
+                x = depthwise_conv1d(x, self._param(index, "w"), self._param(index, "b"), op["stride"])
+            elif kind == "dense":
+                x = ACTIVATIONS[op["activation"]](x @ self._param(index, "w") + self._param(index, "b"))
+            elif kind == "maxpool":
+                sign = self._param(index, "sign")
+                x = maxpool1d(x if sign is None else x * sign, op["size"], op["stride"])
+            elif kind == "flatten":
+                x = x.reshape(x.shape[0], -1)
+            elif kind == "gap":
+                x = x.mean(axis=1)
+            elif kind == "affine":
+                x = x * self._param(index, "scale") + self._param(index, "shift")
+            elif kind == "activation":
+                x = ACTIVATIONS[op["activation"]](x)
+            else:
+                raise ValueError(f"未知算子类型: {kind}")
+        return x
+
+    def predict(self, x, batch_size=32, verbose=0):
+        """分批前向计算，限制 im2col 中间结果的内存占用"""
+        x = np.asarray(x)
+        outputs = [self.predict_on_batch(x[i:i + batch_size]) for i in range(0, x.shape[0], batch_size)]
+        return np.concatenate(outputs) if outputs else np.empty((0, len(self.labels)), dtype=self.dtype)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="导出 SavedModel 权重为 NumPy 引擎 .npz 并校验输出")
+    parser.add_argument("model", help="SavedModel 目录或 .h5 文件")
+    parser.add_argument("output", help="输出 .npz 路径")
+    parser.add_argument("--verify", type=int, default=64, help="用多少个随机窗口校验与 Keras 输出的一致性，0 表示跳过")
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    import tensorflow as tf
+    keras_model = tf.keras.models.load_model(args.model)
+    export_npz(keras_model, args.output)
+    print(f"已导出: {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+    if args.verify:
+        x = np.random.randn(args.verify, *keras_model.input_shape[1:]).astype(np.float32)
+        expected = keras_model.predict(x, verbose=0)
+        actual = NumpyGestureModel(args.output).predict(x)
+        max_err = float(np.abs(expected - actual).max())
+        print(f"最大概率误差: {max_err:.2e} ({'通过' if max_err <= args.atol else '未通过'})")
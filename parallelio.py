@@ -0,0 +1,74 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from EMGGestureClassifier import WINDOW_SIZE, NUM_CHANNELS
+
+# 并行 CSV 读取：用进程池解析无表头、固定形状 (3000, 4) 的窗口 CSV 文件
+# 注意：Windows 下使用多进程时，调用脚本需放在 if __name__ == "__main__": 之下
+
+
+def parse_window_csv(path, shape=(WINDOW_SIZE, NUM_CHANNELS)):
+    """
+    快速解析一个无表头的浮点 CSV 窗口文件
+    把换行替换为逗号后由 NumPy 一次解析，比 pd.read_csv 少了列类型推断和 DataFrame 构建
+    :param path: CSV 文件路径
+    :param shape: 期望的数据形状
+    :return: float32 数组，形状为 shape
+    """
+    with open(path, "rb") as f:
+        text = f.read().replace(b"\n", b",").decode("ascii")
+    values = np.fromstring(text, dtype=np.float32, sep=",")
+    if values.size != shape[0] * shape[1]:
+        raise ValueError(f"文件 {path} 数据点数为 {values.size}，期望形状 {shape}")
+    return values.reshape(shape)
+
+
+def _parse_chunk(paths, shape):
+    """进程池任务：解析一组文件，返回 (数据, 是否有效)；无效文件对应的数据为 0"""
+    out = np.zeros((len(paths), *shape), dtype=np.float32)
+    valid = np.zeros(len(paths), dtype=bool)
+    for i, path in enumerate(paths):
+        try:
+            out[i] = parse_window_csv(path, shape)
+            valid[i] = True
+        except (ValueError, UnicodeDecodeError):
+            pass
+    return out, valid
+
+
+def iter_windows(paths, workers=None, chunk_size=64, shape=(WINDOW_SIZE, NUM_CHANNELS)):
+    """
+    按原始顺序逐块并行解析窗口文件
+    :param paths: 文件路径列表
+    :param workers: 进程数，默认 os.cpu_count()；为 1 时在当前进程中顺序解析
+    :param chunk_size: 每个任务解析的文件数
+    :return: 生成器，每次产出 (该块路径列表, 形状 (n, 3000, 4) 的数据, 有效标记数组)
+    """
+    paths = list(paths)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield (chunk, *_parse_chunk(chunk, shape))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 限制同时在途的任务数，消费端较慢时内存不会随文件数增长
+        pending = deque()
+        chunk_iter = iter(chunks)
+        for chunk in chunk_iter:
+            pending.append((chunk, executor.submit(_parse_chunk, chunk, shape)))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            chunk, future = pending.popleft()
+            next_chunk = next(chunk_iter, None)
+            if next_chunk is not None:
+                pending.append((next_chunk, executor.submit(_parse_chunk, next_chunk, shape)))
+            yield (chunk, *future.result())
+
+
+def list_window_files(directory):
+    """列出目录下所有 CSV 文件（按文件名排序）"""
+    return [os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith('.csv')]
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import argparse
+import numpy as np
+from datacache import load_data
+
+# 低精度推理：把 SavedModel 转换为 float16 权重或 int8 训练后量化的 TFLite 模型，
+# 并对比各模式在测试集上的准确率、模型大小和单窗口延迟
+
+QUANT_MODES = ("float32", "float16", "int8")
+
+
+def convert_tflite(model, mode, calibration_windows=None, num_calibration=200):
+    """
+    转换为 TFLite 模型（需要 TensorFlow）
+    :param model: tf.keras 模型
+    :param mode: "float32"（不量化）、"float16"（权重半精度）或 "int8"（权重与激活均为 int8）
+    :param calibration_windows: int8 模式下用于校准激活范围的标准化窗口，形状 (N, 3000, 4)
+    :param num_calibration: 最多使用多少个校准窗口
+    :return: TFLite 模型字节串
+    """
+    import tensorflow as tf
+    if mode not in QUANT_MODES:
+        raise ValueError(f"不支持的量化模式: {mode}，可选: {QUANT_MODES}")
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if mode == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif mode == "int8":
+        if calibration_windows is None:
+            raise ValueError("int8 量化需要提供校准窗口 calibration_windows")
+        calibration = calibration_windows[:num_calibration].astype(np.float32)
+
+        def representative_dataset():
+            for window in calibration:
+                yield [window[np.newaxis]]
+
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # 输入输出保持 float32，预处理和结果解析无需改动
+        converter.inference_input_type = tf.float32
+        converter.inference_output_type = tf.float32
+    return converter.convert()
+
+
+def _load_interpreter(tflite_path, num_threads):
+    """优先使用轻量的 tflite_runtime，未安装时退回 TensorFlow 自带的解释器"""
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=tflite_path, num_threads=num_threads)
+
+
+class TFLiteGestureModel:
+    """
+    TFLite 推理运行时
+    提供与 Keras 模型相同的 predict / predict_on_batch 接口，可直接替换 EMGGestureClassifier.model
+    """
+
+    def __init__(self, tflite_path, num_threads=None):
+        """
+        :param tflite_path: convert_tflite 生成的 .tflite 文件
+        :param num_threads: 解释器线程数，默认由运行时决定
+        """
+        self.interpreter = _load_interpreter(tflite_path, num_threads)
+        input_details = self.interpreter.get_input_details()[0]
+        self._input_index = input_details["index"]
+        self.input_shape = tuple(int(d) for d in input_details["shape"][1:])  # (窗口长度, 通道数)
+        self._output_index = self.interpreter.get_output_details()[0]["index"]
+        self._batch = None
+
+    def predict_on_batch(self, x):
+        """
+        对一个批次执行前向计算
+        :param x: 形状 (N, 3000, 4) 的标准化数据
+        :return: 形状 (N, 类别数) 的概率矩阵
+        """
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.shape[0] != self._batch:
+            # 批大小变化时才重新分配张量
+            self.interpreter.resize_tensor_input(self._input_index, x.shape)
+            self.interpreter.allocate_tensors()
+            self._batch = x.shape[0]
+        self.interpreter.set_tensor(self._input_index, x)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output_index).copy()
+
+    def predict(self, x, batch_size=32, verbose=0):
+        """分批前向计算"""
+        x = np.asarray(x)
+        outputs = [self.predict_on_batch(x[i:i + batch_size]) for i in range(0, x.shape[0], batch_size)]
+        return np.concatenate(outputs) if outputs else np.empty((0, 0), dtype=np.float32)
+
+
+def _path_size(path):
+    """文件或目录（SavedModel）的总字节数"""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+
+
+def _window_latency_ms(model, window, n_calls=200, warmup=10):
+    """单窗口推理延迟的中位数和 p99（毫秒）"""
+    batch = window[np.newaxis].astype(np.float32)
+    for _ in range(warmup):
+        model.predict_on_batch(batch)
+    latencies = np.empty(n_calls)
+    for i in range(n_calls):
+        start = time.perf_counter()
+        model.predict_on_batch(batch)
+        latencies[i] = (time.perf_counter() - start) * 1000
+    return float(np.percentile(latencies, 50)), float(np.percentile(latencies, 99))
+
+
+def quantization_report(model_path, base_dir, output_dir, letters=('i', 'b', 'h', 'e'), n_calls=200):
+    """
+    生成各精度模式的对比报告
+    :param model_path: float32 基线 SavedModel 路径
+    :param base_dir: i/b/h/e 分段数据所在目录
+    :param output_dir: .tflite 文件输出目录
+    :return: 每种模式一行的结果列表
+    """
+    import tensorflow as tf
+    from sklearn.model_selection import train_test_split
+
+    tf.get_logger().setLevel('ERROR')
+    keras_model = tf.keras.models.load_model(model_path)
+    X, y = load_data(base_dir, letters)
+    # 与 cnnrun.py 相同的划分，测试集只用于评估，校准只用训练集
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    calibration = X_train[np.random.default_rng(0).permutation(len(X_train))]
+
+    rows = []
+    baseline_pred = np.argmax(keras_model.predict(X_test, verbose=0), axis=1)
+    p50, p99 = _window_latency_ms(keras_model, X_test[0], n_calls)
+    rows.append({
+        "mode": "keras-float32",
+        "accuracy": float(np.mean(baseline_pred == y_test)),
+        "agreement": 1.0,
+        "size_mb": _path_size(model_path) / 1e6,
+        "latency_p50_ms": p50,
+        "latency_p99_ms": p99,
+    })
+
+    os.makedirs(output_dir, exist_ok=True)
+    for mode in QUANT_MODES:
+        tflite_path = os.path.join(output_dir, f"emg_gesture_model_{mode}.tflite")
+        with open(tflite_path, "wb") as f:
+            f.write(convert_tflite(keras_model, mode, calibration))
+        model = TFLiteGestureModel(tflite_path)
+        pred = np.argmax(model.predict(X_test), axis=1)
+        p50, p99 = _window_latency_ms(model, X_test[0], n_calls)
+        rows.append({
+            "mode": f"tflite-{mode}",
+            "accuracy": float(np.mean(pred == y_test)),
+            "agreement": float(np.mean(pred == baseline_pred)),  # 与基线预测一致的比例
+            "size_mb": _path_size(tflite_path) / 1e6,
+            "latency_p50_ms": p50,
+            "latency_p99_ms": p99,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="float16 / int8 量化并对比准确率、模型大小和延迟")
+    parser.add_argument("--model", default="emg_gesture_model")
+    parser.add_argument("--data-dir", default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument("--output-dir", default="quantized_models")
+    parser.add_argument("--calls", type=int, default=200, help="延迟测试的调用次数")
+    parser.add_argument("--json", help="可选，将报告写入 JSON 文件")
+    args = parser.parse_args()
+
+    report = quantization_report(args.model, args.data_dir, args.output_dir, n_calls=args.calls)
+    print(f"{'模式':<16}{'准确率':>8}{'一致率':>8}{'大小(MB)':>10}{'p50(ms)':>10}{'p99(ms)':>10}")
+    for row in report:
+        print(f"{row['mode']:<16}{row['accuracy']:>8.4f}{row['agreement']:>8.4f}{row['size_mb']:>10.2f}"
+              f"{row['latency_p50_ms']:>10.3f}{row['latency_p99_ms']:>10.3f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
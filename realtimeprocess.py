@@ -1,18 +1,230 @@
-from EMGGestureClassifier import EMGGestureClassifier
+import os
+import sys
+import json
+import time
+import socket
+import argparse
 import numpy as np
+from EMGGestureClassifier import EMGGestureClassifier, NUM_CHANNELS, SAMPLING_RATE
+from streamrecognizer import StreamingGestureRecognizer
+from instrumentation import Instrumentation
+from activitygate import ActivityGate, GATE_METHODS
+from earlydecision import EarlyDecisionRecognizer, load_window_models
+from resampler import PolyphaseResampler
 
-# 初始化分类器
-classifier = EMGGestureClassifier("emg_gesture_model.h5")  # 或使用SavedModel路径
+# 无界面的连续识别：从文件、标准输入或本地 socket 读取连续的 4 通道数据流，
+# 按 hop 增量切窗口识别，每个结果输出一行 JSON，并在标准错误输出上报告吞吐量和相对实时的延迟
+# 输入采样率与模型不同（如 1000 Hz 采集）时，先逐块重采样到模型的 2000 Hz；
+# 此时 hop、sample_index 均以重采样后的样本计
+#
+# 输入格式（标准输入 / socket）：
+#   csv     每行一个样本，各通道以逗号分隔（与 dataread.py 输出的 {letter}.csv 相同）
+#   binary  float32 小端，按 (样本, 通道) 连续存放（与 recorder.py 的数据区相同）
+#
+# 用法举例：
+#   python realtimeprocess.py --input i.csv
+#   python realtimeprocess.py --input session.emgrec --speed 1
+#   cat i.csv | python realtimeprocess.py --input - --output results.jsonl
+#   python realtimeprocess.py --input tcp://127.0.0.1:5555 --format binary
+#   python realtimeprocess.py --input i.csv --window-models window_models --threshold 0.9   （多窗口长度提前决策）
 
-# 模拟实时数据（3000行 x 4列）
-sample_data = np.random.randn(3000, 4)  # 替换为实际采集数据
 
-# 预处理 + 预测
-try:
-    processed = classifier.preprocess(sample_data)
-    result = classifier.predict(processed)
-    print(f"手势识别结果: {result['label']} (置信度: {result['confidence']:.2%})")
-    print("各类别概率:", result['probabilities'])
-except ValueError as e:
-    print(f"输入数据错误: {str(e)}")
+def iter_file(path, chunk_size, speed=0.0):
+    """
+    按块读取录音文件（.emgrec / .npy / .csv），可按采样率节奏回放
+    :param speed: 相对实时的倍速，0 表示尽快读取
+    :return: (采样率, 数据块生成器)，采样率只有 .emgrec 文件头中才有，其他格式为 None
+    """
+    from daqsource import ReplaySource
+    source = ReplaySource.from_file(path, speed=speed, loop=False)
+    sampling_rate = source.sampling_rate if path.lower().endswith(".emgrec") else None
 
+    def chunks():
+        source.start()
+        while not source.finished:
+            chunk = source.read(chunk_size).T
+            if chunk.shape[0]:
+                yield chunk
+    return sampling_rate, chunks()
+
+
+def iter_stream(stream, fmt="csv", num_channels=NUM_CHANNELS, read_size=65536):
+    """
+    从二进制流（标准输入 / socket 文件对象）中按到达顺序读取数据块，只产出完整的样本
+    :param stream: 具有 read1 或 read 方法的二进制流
+    :param fmt: "csv" 或 "binary"
+    """
+    read = getattr(stream, "read1", stream.read)
+    frame_bytes = 4 * num_channels
+    pending = b""
+    while True:
+        data = read(read_size)
+        if not data:
+            break
+        pending += data
+        if fmt == "binary":
+            n = len(pending) // frame_bytes
+            if n:
+                yield np.frombuffer(pending[:n * frame_bytes], dtype="<f4").reshape(n, num_channels)
+                pending = pending[n * frame_bytes:]
+        else:
+            cut = pending.rfind(b"\n") + 1
+            if cut:
+                text, pending = pending[:cut], pending[cut:]
+                # 换行也视为分隔符，整块一次解析（同 parallelio.parse_window_csv）
+                values = np.fromstring(text.replace(b"\r", b"").replace(b"\n", b",").decode(), sep=",")
+                if values.size % num_channels:
+                    raise ValueError(f"数据块中的数值个数 {values.size} 不是通道数 {num_channels} 的整数倍")
+                yield values.reshape(-1, num_channels).astype(np.float32)
+
+
+def open_socket(address):
+    """
+    监听本地 socket 并接受一个连接：tcp://host:port 或 unix:///path/to.sock
+    :return: 连接的二进制文件对象
+    """
+    if address.startswith("unix://"):
+        path = address[len("unix://"):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+    else:
+        host, port = address[len("tcp://"):].rsplit(":", 1)
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((host, int(port)))
+    server.listen(1)
+    print(f"等待数据连接: {address}", file=sys.stderr)
+    conn, _ = server.accept()
+    server.close()
+    return conn.makefile("rb")
+
+
+class StreamStats:
+    """持续吞吐量（窗口/秒）与相对实时的延迟"""
+
+    def __init__(self, sampling_rate):
+        self.sampling_rate = sampling_rate
+        self.start = None
+        self.samples = 0
+        self.windows = 0
+
+    def update(self, samples, windows):
+        if self.start is None:
+            self.start = time.perf_counter()  # 以第一块数据到达为流的起点
+        self.samples += samples
+        self.windows += windows
+
+    def summary(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9) if self.start is not None else 0.0
+        stream_seconds = self.samples / self.sampling_rate
+        return {
+            "elapsed_s": elapsed,
+            "stream_s": stream_seconds,
+            "windows": self.windows,
+            "windows_per_s": self.windows / elapsed if elapsed else 0.0,
+            "realtime_factor": stream_seconds / elapsed if elapsed else 0.0,  # >1 表示快于实时
+            # 实时数据源的处理进度落后于已经过去的时间的程度；文件尽快读取时为 0
+            "lag_s": max(0.0, elapsed - stream_seconds),
+        }
+
+
+def run(args):
+    sampling_rate = args.sampling_rate
+    if args.input == "-":
+        chunks = iter_stream(sys.stdin.buffer, args.format)
+    elif args.input.startswith(("tcp://", "unix://")):
+        chunks = iter_stream(open_socket(args.input), args.format)
+    else:
+        file_rate, chunks = iter_file(args.input, args.chunk_size, args.speed)
+        sampling_rate = file_rate or sampling_rate
+
+    resampler = None
+    delay = 0.0
+    if sampling_rate != SAMPLING_RATE:
+        resampler = PolyphaseResampler.from_rates(sampling_rate, SAMPLING_RATE, NUM_CHANNELS)
+        delay = resampler.delay
+        print(f"输入采样率 {sampling_rate:g} Hz，重采样到模型的 {SAMPLING_RATE} Hz", file=sys.stderr)
+
+    instrumentation = Instrumentation()
+    gate = None
+    if args.gate:
+        gate = ActivityGate(NUM_CHANNELS, SAMPLING_RATE, method=args.gate, threshold_factor=args.gate_factor)
+    if args.window_models:
+        classifiers = load_window_models(args.window_models, args.backend, instrumentation)
+        recognizer = EarlyDecisionRecognizer(classifiers, hop=args.hop, threshold=args.threshold,
+                                             sampling_rate=SAMPLING_RATE, gate=gate)
+    else:
+        classifier = EMGGestureClassifier(args.model, fast_inference=args.backend == "keras", backend=args.backend,
+                                          instrumentation=instrumentation)
+        recognizer = StreamingGestureRecognizer(classifier, hop=args.hop, gate=gate)
+    stats = StreamStats(sampling_rate)
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    next_report = time.perf_counter() + args.report_interval
+
+    def report(final=False):
+        summary = stats.summary()
+        e2e = instrumentation.snapshot().get("end_to_end")
+        latency = f", 端到端 p50 {e2e['p50_ms']:.1f} / p99 {e2e['p99_ms']:.1f} ms" if e2e else ""
+        gated = f", 跳过 {gate.windows_gated} 个静息窗口 ({gate.stats()['gated_fraction']:.0%})" if gate else ""
+        print(f"{'总计' if final else '进度'}: {summary['stream_s']:.1f} 秒数据, {summary['windows']} 个窗口, "
+              f"{summary['windows_per_s']:.1f} 窗口/秒, {summary['realtime_factor']:.2f}x 实时, "
+              f"延迟 {summary['lag_s']:.3f} 秒{latency}{gated}", file=sys.stderr, flush=True)
+
+    try:
+        for chunk in chunks:
+            results = recognizer.push(chunk if resampler is None else resampler.process(chunk))
+            wall_time = time.time()
+            stats.update(chunk.shape[0], len(results))
+            for result in results:
+                record = {
+                    # 窗口末尾在数据流中的时刻（秒），扣除重采样滤波器的延迟
+                    "t": (result["sample_index"] - delay) / SAMPLING_RATE,
+                    "sample_index": result["sample_index"],
+                    "wall_time": wall_time,
+                    "label": result["label"],
+                    "confidence": float(result["confidence"]),
+                    "probabilities": {label: float(p) for label, p in result["probabilities"].items()},
+                }
+                if gate is not None and "gated" in result:
+                    record["gated"] = result["gated"]
+                if "decision_time" in result:
+                    # 提前决策模式：做出决策的窗口长度（秒）、从决策起点到输出的时间、是否提前输出
+                    record["window_s"] = result["window_size"] / SAMPLING_RATE
+                    record["decision_time"] = result["decision_time"]
+                    record["early"] = result["early"]
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if results:
+                output.flush()
+            if args.report_interval and time.perf_counter() >= next_report:
+                report()
+                next_report += args.report_interval
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    report(final=True)
+    return stats.summary()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="无界面的连续肌电手势识别，结果按 JSON lines 输出")
+    parser.add_argument("--input", required=True,
+                        help="录音文件(.emgrec/.npy/.csv)、- 表示标准输入、tcp://host:port 或 unix:///path 监听 socket")
+    parser.add_argument("--format", default="csv", choices=["csv", "binary"], help="标准输入 / socket 的数据格式")
+    parser.add_argument("--model", default="emg_gesture_model")
+    parser.add_argument("--backend", default="keras", choices=["keras", "numpy", "tflite"])
+    parser.add_argument("--window-models", help="earlydecision.py 训练的多窗口长度模型目录，启用提前决策模式（代替 --model）")
+    parser.add_argument("--threshold", type=float, default=0.9, help="提前决策模式下提前输出所需的置信度")
+    parser.add_argument("--sampling-rate", type=float, default=SAMPLING_RATE,
+                        help="输入数据的采样率（.emgrec 取文件头），与模型不同时自动重采样")
+    parser.add_argument("--hop", type=int, default=500, help="两次识别之间的样本数")
+    parser.add_argument("--gate", choices=GATE_METHODS, help="启用活动检测门控，静息窗口不送入模型")
+    parser.add_argument("--gate-factor", type=float, default=4.0, help="门控阈值：块能量超过噪声基底的倍数")
+    parser.add_argument("--speed", type=float, default=0.0, help="读取文件时按实时的倍速回放，0 表示尽快读取")
+    parser.add_argument("--chunk-size", type=int, default=200, help="读取文件时每块的样本数")
+    parser.add_argument("--output", help="结果输出文件，默认标准输出")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="进度报告间隔（秒），0 表示只在结束时报告")
+    run(parser.parse_args())
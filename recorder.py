@@ -0,0 +1,217 @@
+import os
+import sys
+import time
+import struct
+import argparse
+import datetime
+import threading
+import numpy as np
+
+# 连续记录：后台线程把采集缓冲区中的每个样本追加写入二进制文件，达到大小上限时自动切换新文件
+#
+# 文件格式（.emgrec）：
+#   64 字节文件头  magic(8s) version(H) num_channels(H) sampling_rate(d) start_index(q) start_time(d)，其余补零
+#   数据区        float32 小端，按 (样本, 通道) 顺序连续存放
+# 只追加、不回写文件头，样本数由文件大小得出，程序中途退出时已写入的数据仍然可读
+
+MAGIC = b"EMGREC\x00\x00"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<8sHHdqd")
+HEADER_SIZE = 64
+DTYPE = np.dtype("<f4")
+
+
+def _write_header(f, num_channels, sampling_rate, start_index, start_time):
+    f.write(HEADER.pack(MAGIC, FORMAT_VERSION, num_channels, sampling_rate, start_index, start_time)
+            .ljust(HEADER_SIZE, b"\x00"))
+
+
+def read_header(path):
+    """
+    读取记录文件头
+    :return: dict(version, num_channels, sampling_rate, start_index, start_time, num_samples)
+    """
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:8] != MAGIC:
+        raise ValueError(f"不是有效的记录文件: {path}")
+    _, version, num_channels, sampling_rate, start_index, start_time = HEADER.unpack_from(raw)
+    if version != FORMAT_VERSION:
+        raise ValueError(f"不支持的记录文件版本: {version}")
+    frame_bytes = DTYPE.itemsize * num_channels
+    return {
+        "version": version,
+        "num_channels": num_channels,
+        "sampling_rate": sampling_rate,
+        "start_index": start_index,  # 第一个样本的采集序号
+        "start_time": start_time,  # 第一个样本的采集时刻（Unix 时间戳，近似）
+        "num_samples": (os.path.getsize(path) - HEADER_SIZE) // frame_bytes,  # 末尾不完整的样本被忽略
+    }
+
+
+def read_recording(path):
+    """
+    读取记录文件
+    :return: (header, data)，data 为形状 (num_samples, num_channels) 的只读 memmap
+    """
+    header = read_header(path)
+    shape = (header["num_samples"], header["num_channels"])
+    if header["num_samples"] == 0:
+        return header, np.empty(shape, dtype=DTYPE)
+    return header, np.memmap(path, dtype=DTYPE, mode="r", offset=HEADER_SIZE, shape=shape)
+
+
+def convert_to_csv(path, csv_path=None, chunk_rows=100000):
+    """
+    把记录文件转换为 CSV（与"保存波形数据"相同的 Time,Channel1,... 格式），按块处理，内存占用固定
+    :param csv_path: 输出路径，默认与记录文件同名的 .csv
+    :return: 输出路径
+    """
+    header, data = read_recording(path)
+    if csv_path is None:
+        csv_path = os.path.splitext(path)[0] + ".csv"
+    num_channels = header["num_channels"]
+    rate = header["sampling_rate"]
+    # 一次格式化整块数据，比 np.savetxt 逐行格式化快得多
+    row_format = "%.6f" + ",%.7g" * num_channels + "\n"
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(",".join(["Time"] + [f"Channel{i + 1}" for i in range(num_channels)]) + "\n")
+        for start in range(0, data.shape[0], chunk_rows):
+            block = np.asarray(data[start:start + chunk_rows], dtype=np.float64)
+            rows = np.empty((block.shape[0], num_channels + 1))
+            rows[:, 0] = (header["start_index"] + start + np.arange(block.shape[0])) / rate
+            rows[:, 1:] = block
+            f.write((row_format * rows.shape[0]) % tuple(rows.ravel()))
+    return csv_path
+
+
+class StreamRecorder(threading.Thread):
+    """
+    后台记录线程
+    订阅 AcquisitionThread 发布的数据块，把自启动以来的全部样本追加写入 .emgrec 文件，
+    文件达到 max_file_size 时切换到新文件。队列默认使用 block 策略（对采集线程施加有限的背压），
+    磁盘长时间跟不上而丢失数据块时，记入 dropped_samples 并从新文件开始（每个文件内的样本始终连续）。
+    """
+
+    def __init__(self, acquisition, directory, max_file_size=100, prefix="emg", flush_interval=5.0,
+                 queue_seconds=10.0, policy="block"):
+        """
+        :param acquisition: AcquisitionThread
+        :param directory: 保存目录
+        :param max_file_size: 单个文件大小上限（MB）
+        :param prefix: 文件名前缀，文件名为 {prefix}_{开始时间}_{序号}.emgrec
+        :param flush_interval: 刷新到磁盘的间隔（秒）
+        :param queue_seconds: 订阅队列可容纳的数据时长（秒）
+        :param policy: 订阅队列满时的处理策略，见 acquisition.SUBSCRIBER_POLICIES
+        """
+        super().__init__(name="StreamRecorder", daemon=True)
+        self.acquisition = acquisition
+        self.directory = directory
+        self.max_bytes = max(int(max_file_size * 1024 * 1024), HEADER_SIZE + 1)
+        self.prefix = prefix
+        self.flush_interval = flush_interval
+        self.queue_chunks = max(1, int(queue_seconds * acquisition.sampling_rate / acquisition.samples_per_read))
+        self.policy = policy
+        self.num_channels = acquisition.buffer.num_channels
+        self.frame_bytes = DTYPE.itemsize * self.num_channels
+
+        self.files = []  # 已创建的文件路径
+        self.samples_written = 0
+        self.dropped_samples = 0
+        self.last_flush = None  # 最近一次刷新到磁盘的时刻（time.time()）
+        self.error = None
+        self._session = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._file = None
+        self._file_bytes = 0
+        self._stop_event = threading.Event()
+
+    @property
+    def current_file(self):
+        return self.files[-1] if self.files else None
+
+    def run(self):
+        subscription = self.acquisition.subscribe("recorder", maxsize=self.queue_chunks, policy=self.policy)
+        cursor = None
+        last_flush = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                item = subscription.get(timeout=0.5)
+                if item is not None:
+                    cursor = self._write_chunk(cursor, *item)
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    self._flush()
+                    last_flush = time.monotonic()
+            subscription.close()
+            for item in subscription.get_all():  # 写完停止前已采集的数据
+                cursor = self._write_chunk(cursor, *item)
+        except Exception as e:
+            self.error = e
+            print(f"记录失败: {str(e)}")
+        finally:
+            subscription.close()
+            self._close_file()
+
+    def stop(self, timeout=None):
+        """停止记录，写完剩余数据并关闭文件"""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def _write_chunk(self, cursor, start, data):
+        """写入一个数据块，返回下一个样本的序号"""
+        if cursor is not None and start > cursor:
+            self.dropped_samples += start - cursor
+            self._close_file()
+        self._write(start, data)
+        return start + data.shape[0]
+
+    def _write(self, start_index, data):
+        data = np.ascontiguousarray(data, dtype=DTYPE)
+        offset = 0
+        while offset < data.shape[0]:
+            if self._file is None:
+                self._open_file(start_index + offset)
+            room = max((self.max_bytes - self._file_bytes) // self.frame_bytes, 1)
+            piece = data[offset:offset + room]
+            self._file.write(piece.tobytes())
+            self._file_bytes += piece.nbytes
+            self.samples_written += piece.shape[0]
+            offset += piece.shape[0]
+            if self._file_bytes + self.frame_bytes > self.max_bytes:
+                self._close_file()
+
+    def _open_file(self, start_index):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.prefix}_{self._session}_{len(self.files) + 1:03d}.emgrec")
+        # 由当前采集进度推算该文件第一个样本的时刻
+        lag = (self.acquisition.total_samples - start_index) / self.acquisition.sampling_rate
+        self._file = open(path, "wb")
+        _write_header(self._file, self.num_channels, self.acquisition.sampling_rate, start_index, time.time() - lag)
+        self._file_bytes = HEADER_SIZE
+        self.files.append(path)
+
+    def _flush(self):
+        if self._file is not None:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self.last_flush = time.time()
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self.last_flush = time.time()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="把 .emgrec 记录文件转换为 CSV")
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--output", help="输出 CSV 路径（仅转换单个文件时可用）")
+    args = parser.parse_args()
+    if args.output and len(args.files) > 1:
+        sys.exit("--output 只能用于单个文件")
+    for file in args.files:
+        start = time.perf_counter()
+        output = convert_to_csv(file, args.output)
+        print(f"{file} -> {output} ({read_header(file)['num_samples']} 个样本, "
+              f"{time.perf_counter() - start:.2f} 秒)")
@@ -0,0 +1,173 @@
+import numpy as np
+
+
+def _mirror_write(storage, pos, values):
+    """把 values 写入镜像存储 storage（长度 2 * capacity）的 pos 位置，到达末尾时回绕"""
+    cap = storage.shape[0] // 2
+    n = values.shape[0]
+    first = min(n, cap - pos)
+    storage[pos:pos + first] = values[:first]
+    storage[pos + cap:pos + cap + first] = values[:first]
+    rest = n - first
+    if rest:
+        storage[:rest] = values[first:]
+        storage[cap:cap + rest] = values[first:]
+
+
+class MultiChannelRingBuffer:
+    """
+    固定容量的多通道环形缓冲区（时间优先布局，形状 (capacity, num_channels)）
+
+    内部存储为两倍容量的"镜像"数组：每个样本同时写入 i 和 i + capacity 两个位置，
+    因此任意不超过 capacity 的最近数据段都是一段连续内存，可以直接以视图返回，无需拷贝拼接。
+    样本按全局递增的序号编址（第一个写入的样本序号为 0）。
+
+    支持一个写线程与多个读线程并发使用而无需加锁：写入前先声明将要覆盖的区间（_claimed），
+    写完后再发布新的 total_written；读线程用 read / read_since 拷贝数据后检查拷贝期间
+    对应区间是否被覆盖（类似 seqlock）。get / latest 返回的视图只适合单线程使用。
+    """
+
+    def __init__(self, capacity, num_channels, dtype=np.float32):
+        """
+        :param capacity: 缓冲区容量（样本数）
+        :param num_channels: 通道数
+        :param dtype: 存储数据类型
+        """
+        if capacity < 1:
+            raise ValueError(f"capacity 需为正整数，当前值: {capacity}")
+        self.capacity = capacity
+        self.num_channels = num_channels
+        self._buf = np.zeros((2 * capacity, num_channels), dtype=dtype)
+        self._total = 0  # 累计写入的样本数（下一个样本的全局序号），数据写完后才更新
+        self._claimed = 0  # 正在写入的区间终点，写入开始前更新
+
+    def reset(self, start=0):
+        """清空缓冲区，下一个写入的样本序号从 start 开始（存储不重新分配）"""
+        self._total = self._claimed = start
+
+    @property
+    def total_written(self):
+        """累计写入的样本数，单调递增"""
+        return self._total
+
+    def __len__(self):
+        """当前缓冲区中有效的样本数"""
+        return min(self._total, self.capacity)
+
+    def append(self, chunk):
+        """
+        追加一段数据，开销与数据段长度成正比
+        :param chunk: 形状 (n, num_channels) 的数组，n 可以为任意值
+        """
+        chunk = np.asarray(chunk)
+        if chunk.ndim != 2 or chunk.shape[1] != self.num_channels:
+            raise ValueError(f"输入数据形状需为 (n, {self.num_channels})，当前形状: {chunk.shape}")
+        n = chunk.shape[0]
+        cap = self.capacity
+        total = self._total
+        if n > cap:
+            # 只有最后 capacity 个样本会留在缓冲区中
+            total += n - cap
+            chunk = chunk[-cap:]
+            n = cap
+        self._claimed = total + n
+
+        _mirror_write(self._buf, total % cap, chunk)
+        self._total = total + n
+
+    def get(self, start, stop):
+        """
+        按全局序号读取 [start, stop) 区间的数据
+        :return: 形状 (stop - start, num_channels) 的连续只读视图（缓冲区后续写入会改变其内容）
+        """
+        if not (self._total - len(self) <= start <= stop <= self._total):
+            raise IndexError(
+                f"请求区间 [{start}, {stop}) 不在缓冲区范围 [{self._total - len(self)}, {self._total}) 内")
+        offset = start % self.capacity
+        view = self._buf[offset:offset + (stop - start)]
+        view.flags.writeable = False
+        return view
+
+    def latest(self, n=None):
+        """
+        返回最近 n 个样本（默认全部有效样本）
+        :return: 形状 (n, num_channels) 的连续只读视图
+        """
+        if n is None:
+            n = len(self)
+        return self.get(self._total - n, self._total)
+
+    def read(self, start, stop):
+        """
+        按全局序号拷贝 [start, stop) 区间的数据，可在写线程运行时由其他线程调用
+        :return: 形状 (stop - start, num_channels) 的新数组
+        :raises IndexError: 区间不在缓冲区内，或拷贝期间已被写线程覆盖（读取速度跟不上写入）
+        """
+        data = np.array(self.get(start, stop))
+        if start < self._claimed - self.capacity:
+            raise IndexError(f"请求区间 [{start}, {stop}) 在读取期间已被覆盖")
+        return data
+
+    def read_since(self, index):
+        """
+        拷贝从全局序号 index 到最新写入位置的全部数据，可在写线程运行时由其他线程调用
+        若 index 之后的部分数据已被覆盖，则从仍保留的最早样本开始返回，
+        调用方可通过 start - index 得知丢失的样本数
+        :return: (start, data)，data 形状 (total_written - start, num_channels)
+        :raises ValueError: index 超过已写入的样本数
+        """
+        if index > self._total:
+            raise ValueError(f"index 超过已写入的样本数: {index} > {self._total}")
+        while True:
+            total = self._total
+            start = max(index, total - min(total, self.capacity))
+            try:
+                return start, self.read(start, total)
+            except IndexError:
+                # 拷贝期间被覆盖，从新的最早位置重试
+                index = start
+
+
+class TimedRingBuffer(MultiChannelRingBuffer):
+    """
+    附带时间轴的环形缓冲区（单线程使用，如 GUI 的显示历史）
+    时间轴与数据一样镜像存储，每次追加只计算新样本的时间戳，
+    latest / latest_times 返回的都是连续视图，开销与缓冲区容量无关。
+    """
+
+    def __init__(self, capacity, num_channels, sampling_rate, dtype=np.float32):
+        """
+        :param sampling_rate: 采样率（Hz），样本时间戳 = 采集序号 / sampling_rate
+        """
+        super().__init__(capacity, num_channels, dtype)
+        self.sampling_rate = sampling_rate
+        self._times = np.zeros(2 * capacity, dtype=np.float64)
+        self._next_index = 0  # 下一个样本的采集序号
+
+    def append(self, chunk, start_index=None):
+        """
+        :param chunk: 形状 (n, num_channels) 的数组
+        :param start_index: chunk 第一个样本的采集序号，默认紧接上一段（采集端丢弃过数据时传入，时间轴随之跳变）
+        """
+        chunk = np.asarray(chunk)
+        n = chunk.shape[0]
+        if start_index is None:
+            start_index = self._next_index
+        kept = min(n, self.capacity)
+        times = (start_index + np.arange(n - kept, n)) / self.sampling_rate
+        # 时间戳先于数据写入，写入位置与基类 append 相同
+        _mirror_write(self._times, (self._total + n - kept) % self.capacity, times)
+        super().append(chunk)
+        self._next_index = start_index + n
+
+    def latest_times(self, n=None):
+        """
+        最近 n 个样本的时间戳（秒，默认全部有效样本），与 latest(n) 一一对应
+        :return: 形状 (n,) 的连续只读视图
+        """
+        if n is None:
+            n = len(self)
+        offset = (self._total - n) % self.capacity
+        view = self._times[offset:offset + n]
+        view.flags.writeable = False
+        return view
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import os
+from windowdataset import WindowedRecording
 
 # 参数设置
 sampling_rate = 2000
@@ -15,27 +16,31 @@ step_size = int(window_step * sampling_rate)      # 500
 # 输入输出路径配置
 base_dir = "D:/develop/pythonSample/EMGGNN"
 letters = ['i', 'b', 'h', 'e']
+# 窗口不再逐个写成 CSV：连续录音保存为 {letter}.npy，训练时由 windowdataset 按视图取窗口
+# 需要兼容旧流程时设为 True，仍按 {letter}/{letter}_0000.csv 导出每个窗口
+export_csv = False
 
 for letter in letters:
-    # 输入文件路径
+    # 输入文件路径（dataread.py 以 npy 格式输出时直接读取二进制录音）
     input_file = os.path.join(base_dir, f"{letter}.csv")
-    # 输出目录路径
-    output_dir = os.path.join(base_dir, letter)
-    os.makedirs(output_dir, exist_ok=True)
-    
+    npy_file = os.path.join(base_dir, f"{letter}.npy")
+
     # 读取数据
-    data = pd.read_csv(input_file, header=None)
-    num_samples = data.shape[0]
-    
-    # 生成滑动窗口
-    start_idx = 0
-    file_count = 0
-    while start_idx + window_size <= num_samples:
-        end_idx = start_idx + window_size
-        window_data = data.iloc[start_idx:end_idx, :]
-        # 保存窗口数据
-        output_path = os.path.join(output_dir, f"{letter}_{file_count:04d}.csv")
-        window_data.to_csv(output_path, index=False, header=False)
-        # 更新索引和计数器
-        start_idx += step_size
-        file_count += 1
\ No newline at end of file
+    if os.path.exists(npy_file) and not os.path.exists(input_file):
+        data = np.load(npy_file, mmap_mode="r")
+    else:
+        data = pd.read_csv(input_file, header=None, dtype=np.float32).values
+        np.save(npy_file, data)
+
+    # 生成滑动窗口（跨步视图，不复制数据）
+    recording = WindowedRecording(data, label=letters.index(letter), window_size=window_size, hop=step_size)
+    print(f'字母 {letter}: {data.shape[0]} 个样本, {len(recording)} 个窗口')
+
+    if export_csv:
+        # 输出目录路径
+        output_dir = os.path.join(base_dir, letter)
+        os.makedirs(output_dir, exist_ok=True)
+        for file_count, window_data in enumerate(recording.windows):
+            # 保存窗口数据
+            output_path = os.path.join(output_dir, f"{letter}_{file_count:04d}.csv")
+            pd.DataFrame(window_data).to_csv(output_path, index=False, header=False)
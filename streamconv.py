@@ -0,0 +1,252 @@
+import time
+import argparse
+import numpy as np
+from EMGGestureClassifier import WINDOW_SIZE, NUM_CHANNELS
+from numpyengine import NumpyGestureModel
+from ringbuffer import MultiChannelRingBuffer
+
+# 流式卷积引擎：相邻窗口（3000 点窗口、500 点步长）有约 83% 的输入相同，而 Conv1D / MaxPooling1D
+# 对平移是等变的，因此卷积部分的特征图可以按列缓存，每个步长只计算新增的列，
+# 再把拼好的特征图送入 Flatten（或 GlobalAveragePooling1D）-> Dense 头部。
+#
+# 本模型卷积部分的总步长为 4，感受野为 16：第 j 列特征只依赖输入 [4j, 4j + 16)，
+# 特征 [a, b) 需要输入 [4a, 4b + 12)。每个窗口 747 列，每步新增 500 / 4 = 125 列，卷积计算量约为整窗重算的 1/6。
+#
+# 与逐窗口标准化的关系：
+#   preprocess 用每个窗口自身的均值/标准差标准化，同一个样本在不同窗口中的标准化结果不同，
+#   卷积后又经过 ReLU，无法精确复用。引擎改为用一组"参考"统计量标准化，缓存的特征在参考不变期间始终精确：
+#   - 指定 reference=(mean, std) 时固定使用该统计量（如训练集或会话开始时的标定值），从不重算；
+#   - 默认（reference=None）自适应：每个窗口计算自身的均值/标准差，任一通道与参考的偏差超过 drift_tolerance
+#     （均值偏差以标准差计，标准差按相对变化计）时，把参考更新为当前窗口的统计量并重算整窗特征。
+#     重算的窗口与 preprocess 完全一致；其余窗口与逐窗口标准化的差别不超过这一容差，
+#     信号平稳时（静息、持续收缩）几乎不需要重算，在动作起止处重算。
+#   两种方式下，输出都与"用同一参考统计量标准化后整窗重算"在浮点误差内一致（见 verify）。
+
+
+class StreamingConvEngine:
+    """
+    增量计算卷积特征的流式识别器，接口与 StreamingGestureRecognizer 相同（push / reset / samples_seen）
+    只支持 NumpyGestureModel（Keras 模型先用 numpyengine.py 导出为 .npz）
+    """
+
+    def __init__(self, model, hop=500, window_size=WINDOW_SIZE, num_channels=NUM_CHANNELS, reference=None,
+                 drift_tolerance=0.1, on_result=None):
+        """
+        :param model: NumpyGestureModel 实例或 .npz 路径
+        :param hop: 两次识别之间的样本数，需为卷积部分总步长（本模型为 4）的整数倍
+        :param window_size: 窗口长度（样本数）
+        :param num_channels: 通道数
+        :param reference: 可选的固定标准化统计量 (mean, std)，形状均为 (num_channels,)
+        :param drift_tolerance: 自适应模式下触发重算的统计量偏差
+        :param on_result: 可选回调，每次产生识别结果时以结果字典调用
+        """
+        if not isinstance(model, NumpyGestureModel):
+            model = NumpyGestureModel(model)
+        self.model = model
+        self.hop = hop
+        self.window_size = window_size
+        self.num_channels = num_channels
+        self.drift_tolerance = drift_tolerance
+        self.on_result = on_result
+        self.fixed_reference = reference is not None
+        self._init_reference = None if reference is None else tuple(np.asarray(r, np.float64) for r in reference)
+
+        types = [op["type"] for op in model.ops]
+        heads = [i for i, kind in enumerate(types) if kind in ("flatten", "gap")]
+        if not heads:
+            raise ValueError("模型中没有 Flatten / GlobalAveragePooling1D 层，无法拆分卷积部分和头部")
+        self._split = heads[0]
+        self.stride, self.field = self._receptive_field(model.ops[:self._split])
+        if hop % self.stride:
+            raise ValueError(f"hop ({hop}) 需为卷积部分总步长 {self.stride} 的整数倍")
+        self.num_columns = (window_size - self.field) // self.stride + 1  # 每个窗口的特征列数
+        if hop + self.field - self.stride > window_size:
+            raise ValueError(f"hop ({hop}) 过大，新列所需的输入超出窗口长度")
+        # 特征的通道数：对一小段输入试算一次
+        probe = model.forward(np.zeros((1, self.field, num_channels), dtype=model.dtype), 0, self._split)
+        self.feature_channels = probe.shape[2]
+        self.reset()
+
+    def _receptive_field(self, ops):
+        """卷积部分的总步长和感受野：第 j 列依赖输入 [stride * j, stride * j + field)"""
+        stride, field = 1, 1
+        for index, op in enumerate(ops):
+            if op["type"] in ("conv1d", "depthwise_conv1d"):
+                size, step = self.model._param(index, "w").shape[0], op["stride"]
+            elif op["type"] == "maxpool":
+                size, step = op["size"], op["stride"]
+            elif op["type"] in ("affine", "activation"):
+                continue  # 逐元素算子不改变时间维
+            else:
+                raise ValueError(f"卷积部分不支持的算子: {op['type']}")
+            field += (size - 1) * stride
+            stride *= step
+        return stride, field
+
+    def reset(self):
+        """清空缓冲区和特征缓存"""
+        self._raw = MultiChannelRingBuffer(self.window_size, self.num_channels, dtype=np.float32)
+        self._features = MultiChannelRingBuffer(self.num_columns, self.feature_channels, dtype=self.model.dtype)
+        self._reference = self._init_reference
+        self._next_emit = self.window_size
+        self.windows = 0
+        self.columns_computed = 0
+        self.refreshes = 0
+
+    @property
+    def samples_seen(self):
+        return self._raw.total_written
+
+    def stats(self):
+        """每个窗口平均计算的特征列数（整窗重算为 num_columns）及重算次数"""
+        return {
+            "windows": self.windows,
+            "refreshes": self.refreshes,
+            "columns_per_window": self.columns_computed / self.windows if self.windows else 0.0,
+            "full_columns": self.num_columns,
+        }
+
+    def push(self, chunk):
+        """
+        送入一段采集数据
+        :param chunk: 形状 (n, num_channels) 的数组
+        :return: 本次送入期间产生的识别结果列表，字段与 StreamingGestureRecognizer 相同
+        """
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim != 2 or chunk.shape[1] != self.num_channels:
+            raise ValueError(f"输入数据形状需为 (n, {self.num_channels})，当前形状: {chunk.shape}")
+        results = []
+        offset = 0
+        while offset < chunk.shape[0]:
+            n = min(chunk.shape[0] - offset, self._next_emit - self._raw.total_written)
+            self._raw.append(chunk[offset:offset + n])
+            offset += n
+            if self._raw.total_written == self._next_emit:
+                results.append(self._emit())
+                self._next_emit += self.hop
+        return results
+
+    def _columns(self, start, stop):
+        """用当前参考统计量计算全局特征列 [start, stop)"""
+        first = self.stride * start
+        raw = self._raw.get(first, self.stride * (stop - 1) + self.field)
+        mean, std = self._reference
+        x = ((raw - mean) / std).astype(self.model.dtype)[None]
+        self.columns_computed += stop - start
+        return self.model.forward(x, 0, self._split)[0]
+
+    def _needs_refresh(self, window):
+        if self._reference is None:
+            return True
+        if self.fixed_reference:
+            return False
+        mean, std = self._reference
+        w_mean, w_std = window.mean(axis=0), window.std(axis=0)
+        w_std[w_std == 0] = 1.0
+        tol = self.drift_tolerance
+        return bool(np.any(np.abs(w_mean - mean) > tol * std) or np.any(np.abs(np.log(w_std / std)) > np.log1p(tol)))
+
+    def probabilities(self):
+        """
+        当前窗口（最近 window_size 个样本）的类别概率，增量更新特征缓存
+        :return: 形状 (类别数,) 的概率
+        """
+        end = self._raw.total_written
+        stop = (end - self.field) // self.stride + 1  # 可计算的最后一列之后
+        start = stop - self.num_columns
+        window = self._raw.latest(self.window_size).astype(np.float64)
+        have = self._features.total_written
+        if self._needs_refresh(window):
+            std = window.std(axis=0)
+            std[std == 0] = 1.0
+            self._reference = (window.mean(axis=0), std)
+            self.refreshes += 1
+            have = start  # 参考变化，缓存作废
+        elif have < start:
+            have = start  # 中间跳过的列不在当前窗口内
+        if self._features.total_written != have:
+            # 特征缓冲区按全局列序号编址，丢弃作废的列后从 have 开始写
+            self._features.reset(have)
+        if stop > have:
+            self._features.append(self._columns(have, stop))
+        features = self._features.get(start, stop)[None]
+        return self.model.forward(features, self._split)[0]
+
+    def _emit(self):
+        probabilities = self.probabilities()
+        self.windows += 1
+        pred_class = int(np.argmax(probabilities))
+        labels = self.model.labels
+        result = {
+            "label": labels[pred_class],
+            "confidence": float(probabilities[pred_class]),
+            "probabilities": {label: float(p) for label, p in zip(labels, probabilities)},
+            "sample_index": self._raw.total_written,
+        }
+        if self.on_result is not None:
+            self.on_result(result)
+        return result
+
+    def full_recompute(self):
+        """用当前参考统计量对当前窗口整窗重算的概率（校验用）"""
+        mean, std = self._reference
+        window = (self._raw.latest(self.window_size) - mean) / std
+        return self.model.predict_on_batch(window[None])[0]
+
+
+def verify(model, data, hop=500, chunk_size=200, reference=None, drift_tolerance=0.1):
+    """
+    在一段录音上比较增量引擎与整窗重算（在每个窗口输出时立即比较）
+    :return: dict：与同一参考统计量下整窗重算的最大概率误差（应在浮点误差内）、
+             与逐窗口标准化（preprocess）的最大误差及标签一致率、卷积列数和耗时对比
+    """
+    errors = {"exact": 0.0, "per_window": 0.0, "agree": 0, "check_s": 0.0, "full_s": 0.0}
+
+    def check(result):
+        start = time.perf_counter()
+        probs = np.array(list(result["probabilities"].values()))
+        errors["exact"] = max(errors["exact"], float(np.abs(probs - engine.full_recompute()).max()))
+        window = engine._raw.latest(engine.window_size)
+        full_start = time.perf_counter()
+        standardized = (window - window.mean(axis=0)) / window.std(axis=0)
+        expected = engine.model.predict_on_batch(standardized[None])[0]
+        errors["full_s"] += time.perf_counter() - full_start
+        errors["per_window"] = max(errors["per_window"], float(np.abs(probs - expected).max()))
+        errors["agree"] += int(np.argmax(probs) == np.argmax(expected))
+        errors["check_s"] += time.perf_counter() - start
+
+    engine = StreamingConvEngine(model, hop, reference=reference, drift_tolerance=drift_tolerance, on_result=check)
+    start = time.perf_counter()
+    for offset in range(0, data.shape[0], chunk_size):
+        engine.push(data[offset:offset + chunk_size])
+    incremental_s = time.perf_counter() - start - errors["check_s"]
+
+    stats = engine.stats()
+    windows = max(stats["windows"], 1)
+    return {
+        **stats,
+        "max_error_same_reference": errors["exact"],
+        "max_error_per_window": errors["per_window"],
+        "label_agreement_per_window": errors["agree"] / windows,
+        "incremental_ms_per_window": incremental_s / windows * 1000,
+        "full_ms_per_window": errors["full_s"] / windows * 1000,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="校验流式卷积引擎与整窗重算的一致性并比较耗时")
+    parser.add_argument("model", help="numpyengine.py 导出的 .npz")
+    parser.add_argument("--input", help="录音文件（.emgrec/.npy/.csv），默认使用合成信号")
+    parser.add_argument("--seconds", type=float, default=60, help="合成信号的时长（秒）")
+    parser.add_argument("--hop", type=int, default=500)
+    parser.add_argument("--drift-tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+
+    from daqsource import ReplaySource, SyntheticSource
+    if args.input:
+        data = np.asarray(ReplaySource.from_file(args.input).data, dtype=np.float32)
+    else:
+        data = SyntheticSource(sampling_rate=2000, speed=0).read(int(args.seconds * 2000)).T.astype(np.float32)
+    report = verify(args.model, data, hop=args.hop, drift_tolerance=args.drift_tolerance)
+    for key, value in report.items():
+        print(f"{key}: {value:.6g}" if isinstance(value, float) else f"{key}: {value}")
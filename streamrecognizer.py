@@ -0,0 +1,138 @@
+import time
+import numpy as np
+from instrumentation import DISABLED
+from EMGGestureClassifier import WINDOW_SIZE, NUM_CHANNELS
+from ringbuffer import MultiChannelRingBuffer
+
+
+class StreamingGestureRecognizer:
+    """
+    流式滑动窗口识别器
+
+    采集端可以按任意长度（如 DAQ 每次读取的 200 点）送入数据，识别器在内部的固定环形缓冲区中
+    维护最近一个窗口，并增量更新每个通道的均值/方差：每个样本进入和离开窗口时各更新一次，
+    标准化时无需重新扫描 3000 个点。窗口填满后，每隔 hop 个样本输出一次识别结果。
+    """
+
+    def __init__(self, classifier, hop=500, window_size=None, num_channels=NUM_CHANNELS,
+                 on_result=None, instrumentation=None, gate=None):
+        """
+        :param classifier: EMGGestureClassifier 实例（或具有相同 predict 接口的对象）
+        :param hop: 两次识别之间的样本数（与 segmentation.py 的 500 点步长一致）
+        :param window_size: 窗口长度（样本数），默认取 classifier.window_size
+        :param num_channels: 通道数
+        :param on_result: 可选回调，每次产生识别结果时以结果字典调用
+        :param instrumentation: 可选的 Instrumentation，记录 end_to_end 延迟；默认沿用 classifier 的实例
+        :param gate: 可选的 activitygate.ActivityGate，窗口内没有肌肉活动时跳过模型，直接输出静息结果；
+                     启用时每个结果都带有 gated 字段
+        """
+        if hop < 1:
+            raise ValueError(f"hop 需为正整数，当前值: {hop}")
+        self.classifier = classifier
+        self.hop = hop
+        self.window_size = window_size or getattr(classifier, "window_size", WINDOW_SIZE)
+        self.num_channels = num_channels
+        self.on_result = on_result
+        self.gate = gate
+        if instrumentation is None:
+            instrumentation = getattr(classifier, "instrumentation", DISABLED)
+        self.instrumentation = instrumentation
+
+        self._window = np.empty((1, self.window_size, num_channels), dtype=np.float32)  # 复用的模型输入
+        self.reset()
+
+    def reset(self):
+        """清空缓冲区和统计量，重新开始识别"""
+        self._ring = MultiChannelRingBuffer(self.window_size, self.num_channels, dtype=np.float32)
+        self._shift = None  # 以首个样本为参考点累加，减小大直流偏置下的舍入误差
+        self._sum = np.zeros(self.num_channels, dtype=np.float64)
+        self._sumsq = np.zeros(self.num_channels, dtype=np.float64)
+        self._next_emit = self.window_size
+        self._next_resync = self.window_size
+
+    @property
+    def samples_seen(self):
+        """累计送入的样本数"""
+        return self._ring.total_written
+
+    def push(self, chunk):
+        """
+        送入一段采集数据
+        :param chunk: 形状 (n, num_channels) 的数组
+        :return: 本次送入期间产生的识别结果列表（可能为空），
+                 每个结果为 classifier.predict 的返回字典，并附加 sample_index（窗口末尾的全局样本序号）
+        """
+        arrival = time.perf_counter()
+        chunk = np.asarray(chunk, dtype=np.float32)
+        if chunk.ndim != 2 or chunk.shape[1] != self.num_channels:
+            raise ValueError(f"输入数据形状需为 (n, {self.num_channels})，当前形状: {chunk.shape}")
+        if self._shift is None and chunk.shape[0]:
+            self._shift = chunk[0].astype(np.float64)
+
+        results = []
+        offset = 0
+        while offset < chunk.shape[0]:
+            total = self._ring.total_written
+            # 每段数据不超过窗口长度，并在下一个输出点处切开
+            n = min(chunk.shape[0] - offset, self._next_emit - total, self.window_size)
+            self._update(chunk[offset:offset + n])
+            if self.gate is not None:
+                self.gate.update(chunk[offset:offset + n])
+            offset += n
+            if self._ring.total_written == self._next_emit:
+                results.append(self._emit(arrival))
+                self._next_emit += self.hop
+        return results
+
+    def _update(self, piece):
+        """将一段数据写入缓冲区并增量更新统计量"""
+        total = self._ring.total_written
+        leave_start = max(0, total - self.window_size)
+        leave_stop = max(0, total + piece.shape[0] - self.window_size)
+        if leave_stop > leave_start:
+            leaving = self._ring.get(leave_start, leave_stop) - self._shift
+            self._sum -= leaving.sum(axis=0)
+            self._sumsq -= np.square(leaving).sum(axis=0)
+
+        entering = piece - self._shift
+        self._sum += entering.sum(axis=0)
+        self._sumsq += np.square(entering).sum(axis=0)
+        self._ring.append(piece)
+
+        if self._ring.total_written >= self._next_resync:
+            # 窗口每完整滚动一次，就精确重算一次，避免加减累积误差（均摊开销 O(1)/样本）
+            window = self._ring.latest() - self._shift
+            self._sum = window.sum(axis=0)
+            self._sumsq = np.square(window).sum(axis=0)
+            self._next_resync = self._ring.total_written + self.window_size
+
+    def _emit(self, arrival):
+        """
+        用当前窗口的统计量标准化并识别
+        :param arrival: 包含窗口最后一个样本的数据块送入的时间（perf_counter）
+        """
+        if self.gate is not None and not self.gate.check(self.window_size):
+            result = self.gate.rest_result()
+            result["gated"] = True
+            result["sample_index"] = self._ring.total_written
+            if self.on_result is not None:
+                self.on_result(result)
+            return result
+
+        with self.instrumentation.stage("preprocess"):
+            mean = self._sum / self.window_size
+            var = np.maximum(self._sumsq / self.window_size - np.square(mean), 0.0)
+            std = np.sqrt(var)
+            std[std == 0] = 1.0  # 通道无信号时避免除零
+            mean += self._shift
+
+            np.subtract(self._ring.latest(), mean.astype(np.float32), out=self._window[0])
+            np.divide(self._window[0], std.astype(np.float32), out=self._window[0])
+        result = self.classifier.predict(self._window)
+        result["sample_index"] = self._ring.total_written
+        if self.gate is not None:
+            result["gated"] = False
+        self.instrumentation.record("end_to_end", time.perf_counter() - arrival)
+        if self.on_result is not None:
+            self.on_result(result)
+        return result
@@ -0,0 +1,83 @@
+import numpy as np
+import tensorflow as tf
+from sklearn.model_selection import train_test_split
+from EMGGestureClassifier import WINDOW_SIZE
+from windowdataset import WindowedDataset, DEFAULT_HOP
+
+# tf.data 输入管道：直接从连续录音（memmap）按需切窗口，标准化在图内按批向量化完成，
+# 训练/测试集按窗口序号确定性划分，内存占用与数据集大小无关
+
+
+def split_indices(dataset, test_size=0.2, seed=42, mode="random"):
+    """
+    按窗口序号确定性地划分训练/测试集，划分结果只由参数决定，不随 epoch 变化
+    :param dataset: WindowedDataset
+    :param test_size: 测试集比例
+    :param seed: 随机种子
+    :param mode: "random" 与 cnnrun.py 相同的分层随机划分；
+                 "block" 取每段录音末尾连续的一段作为测试集，避免重叠窗口同时出现在两侧
+    :return: (train_idx, test_idx)
+    """
+    indices = np.arange(len(dataset))
+    if mode == "random":
+        return train_test_split(indices, test_size=test_size, random_state=seed, stratify=dataset.labels)
+    if mode == "block":
+        train_idx, test_idx = [], []
+        offset = 0
+        for rec in dataset.recordings:
+            n = len(rec)
+            n_test = int(round(n * test_size))
+            # 测试段前留出 window / hop 个窗口的间隔，使两侧窗口不共享任何样本
+            gap = -(-rec.window_size // rec.hop) - 1
+            train_idx.append(offset + np.arange(max(0, n - n_test - gap)))
+            test_idx.append(offset + np.arange(n - n_test, n))
+            offset += n
+        return np.concatenate(train_idx), np.concatenate(test_idx)
+    raise ValueError(f"不支持的划分方式: {mode}")
+
+
+def _standardize(x, y):
+    """图内按窗口、按通道标准化，x 形状 (batch, 3000, 4)"""
+    mean, var = tf.nn.moments(x, axes=[1], keepdims=True)
+    return (x - mean) / tf.sqrt(var), y
+
+
+def make_dataset(dataset, indices, batch_size=32, shuffle=False, seed=42):
+    """
+    构建一个 tf.data.Dataset，逐批从录音视图中取窗口
+    :param dataset: WindowedDataset
+    :param indices: 参与的窗口序号
+    :param shuffle: 是否每个 epoch 打乱顺序（集合成员固定不变）
+    :return: 产出 (标准化窗口, one-hot 标签) 批次的 Dataset
+    """
+    num_classes = int(dataset.labels.max()) + 1
+    labels = tf.constant(tf.keras.utils.to_categorical(dataset.labels, num_classes), dtype=tf.float32)
+    window_size = dataset.recordings[0].window_size
+    num_channels = dataset.recordings[0].data.shape[1]
+
+    def load_batch(batch_indices):
+        x = tf.numpy_function(dataset.gather, [batch_indices], tf.float32)
+        x.set_shape([None, window_size, num_channels])
+        return x, tf.gather(labels, batch_indices)
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if shuffle:
+        ds = ds.shuffle(len(indices), seed=seed, reshuffle_each_iteration=True)
+    # 先对序号分批，每批只调用一次 gather，再并行完成切窗口和标准化
+    return (ds.batch(batch_size)
+            .map(load_batch, num_parallel_calls=tf.data.AUTOTUNE)
+            .map(_standardize, num_parallel_calls=tf.data.AUTOTUNE)
+            .prefetch(tf.data.AUTOTUNE))
+
+
+def make_train_test(base_dir, letters, batch_size=32, window_size=WINDOW_SIZE, hop=DEFAULT_HOP,
+                    test_size=0.2, seed=42, split="random"):
+    """
+    从连续录音构建训练集和测试集管道
+    :return: (train_ds, test_ds)
+    """
+    dataset = WindowedDataset.from_base_dir(base_dir, letters, window_size, hop)
+    train_idx, test_idx = split_indices(dataset, test_size, seed, split)
+    train_ds = make_dataset(dataset, train_idx, batch_size, shuffle=True, seed=seed)
+    test_ds = make_dataset(dataset, test_idx, batch_size)
+    return train_ds, test_ds
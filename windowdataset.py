@@ -0,0 +1,150 @@
+import os
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import as_strided
+from EMGGestureClassifier import WINDOW_SIZE, NUM_CHANNELS, standardize_windows
+from parallelio import iter_windows, list_window_files
+from datacache import load_cached_recording
+
+# 虚拟滑动窗口数据集：每个手势只保存一段连续录音，窗口以跨步视图（strided view）的形式按需取出，
+# 不再把每个窗口单独写成 CSV（与 segmentation.py 相同的 3000 点窗口、500 点步长）
+
+DEFAULT_HOP = 500
+
+
+class WindowedRecording:
+    """一段连续录音及其上的滑动窗口视图"""
+
+    def __init__(self, data, label, window_size=WINDOW_SIZE, hop=DEFAULT_HOP):
+        """
+        :param data: 连续录音，形状 (T, C)，可以是 ndarray 或 memmap
+        :param label: 该录音对应的类别编号
+        :param window_size: 窗口长度（样本数）
+        :param hop: 窗口步长（样本数）
+        """
+        if data.ndim != 2:
+            raise ValueError(f"录音数据形状需为 (T, C)，当前形状: {data.shape}")
+        if hop < 1 or window_size < 1:
+            raise ValueError(f"window_size 和 hop 需为正整数，当前值: {window_size}, {hop}")
+        self.data = data
+        self.label = label
+        self.window_size = window_size
+        self.hop = hop
+
+    def __len__(self):
+        if self.data.shape[0] < self.window_size:
+            return 0
+        return (self.data.shape[0] - self.window_size) // self.hop + 1
+
+    @property
+    def windows(self):
+        """
+        所有窗口的只读视图，形状 (N, window_size, C)，不复制任何数据
+        第 i 个窗口对应录音的 [i * hop, i * hop + window_size) 区间
+        """
+        s0, s1 = self.data.strides
+        return as_strided(self.data, shape=(len(self), self.window_size, self.data.shape[1]),
+                          strides=(self.hop * s0, s0, s1), writeable=False)
+
+    def __getitem__(self, index):
+        return self.windows[index]
+
+
+class WindowedDataset:
+    """多段录音组成的数据集，窗口按 (录音, 窗口序号) 编址，只在取批次时才复制数据"""
+
+    def __init__(self, recordings):
+        """
+        :param recordings: WindowedRecording 列表
+        """
+        self.recordings = list(recordings)
+        counts = np.array([len(r) for r in self.recordings], dtype=np.int64)
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+        self.labels = np.repeat([r.label for r in self.recordings], counts)
+
+    @classmethod
+    def from_base_dir(cls, base_dir, letters, window_size=WINDOW_SIZE, hop=DEFAULT_HOP, cache_dir=None):
+        """读取每个字母的连续录音（见 load_recording，拼接结果使用 datacache 缓存），标签编号与 letters 顺序一致"""
+        return cls(WindowedRecording(load_recording(base_dir, letter, cache_dir=cache_dir), label, window_size, hop)
+                   for label, letter in enumerate(letters))
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def window(self, index):
+        """按全局序号取一个窗口的视图"""
+        rec = np.searchsorted(self._offsets, index, side="right") - 1
+        return self.recordings[rec][index - self._offsets[rec]]
+
+    def gather(self, indices=None):
+        """
+        按全局序号取出多个原始窗口
+        :param indices: 序号数组，默认全部
+        :return: 形状 (N, window_size, C) 的新数组
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices)
+        recs = np.searchsorted(self._offsets, indices, side="right") - 1
+        first = self.recordings[0]
+        out = np.empty((len(indices), first.window_size, first.data.shape[1]), dtype=np.float32)
+        for rec in np.unique(recs):
+            mask = recs == rec
+            out[mask] = self.recordings[rec].windows[indices[mask] - self._offsets[rec]]
+        return out
+
+    def normalized(self, indices=None):
+        """取出窗口并按窗口、按通道标准化（与训练时一致）"""
+        return standardize_windows(self.gather(indices))
+
+    def batches(self, batch_size=32, indices=None, shuffle=False, seed=None):
+        """
+        逐批生成 (标准化窗口, 标签)，每次只复制一个批次的数据
+        :param indices: 参与迭代的窗口序号，默认全部
+        :param shuffle: 是否打乱顺序
+        :param seed: 打乱顺序的随机种子
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        indices = np.asarray(indices)
+        if shuffle:
+            indices = np.random.default_rng(seed).permutation(indices)
+        for start in range(0, len(indices), batch_size):
+            batch = indices[start:start + batch_size]
+            yield self.normalized(batch), self.labels[batch]
+
+
+def load_recording(base_dir, letter, hop=DEFAULT_HOP, cache_dir=None, rebuild=False):
+    """
+    读取一个字母的连续录音，形状 (T, 4)
+    依次查找：{letter}.npy（segmentation.py 输出，memmap 打开）、{letter}.csv（dataread.py 输出），
+    都不存在时由 {letter}/ 目录中按顺序分段的窗口 CSV 拼回连续录音（相邻窗口重叠 window - hop 个样本），
+    拼接结果写入 datacache 缓存目录，之后直接以 memmap 打开
+    :param cache_dir: 缓存目录，默认 base_dir/.emg_cache
+    :param rebuild: 为 True 时忽略现有缓存重新拼接
+    """
+    npy_path = os.path.join(base_dir, f"{letter}.npy")
+    if os.path.exists(npy_path):
+        return np.load(npy_path, mmap_mode="r")
+    csv_path = os.path.join(base_dir, f"{letter}.csv")
+    if os.path.exists(csv_path):
+        return pd.read_csv(csv_path, header=None, dtype=np.float32).values
+
+    letter_dir = os.path.join(base_dir, letter)
+    files = list_window_files(letter_dir) if os.path.isdir(letter_dir) else []
+    if not files:
+        raise FileNotFoundError(f"找不到字母 {letter} 的录音: {npy_path} / {csv_path} / {letter_dir}")
+    return load_cached_recording(base_dir, letter, lambda: _join_windows(files, hop), hop, cache_dir, rebuild)
+
+
+def _join_windows(files, hop):
+    """把按顺序分段的窗口 CSV 拼回连续录音"""
+    parts = []
+    for chunk, windows, valid in iter_windows(files):
+        if not valid.all():
+            raise ValueError(f"窗口文件形状异常: {chunk[int(np.argmin(valid))]}")
+        if not parts:
+            parts.append(windows[0])
+            windows = windows[1:]
+        parts.append(windows[:, -hop:].reshape(-1, NUM_CHANNELS))
+    return np.concatenate(parts)